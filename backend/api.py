@@ -1,18 +1,26 @@
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Body
 from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from backend import othertowürth
-from matchmaking.matchmaking import match_wuerth_components, rules
+from matchmaking.matchmaking import match_wuerth_components, match_many, rerank_components, normalize_source, current_state, reload_catalog, start_catalog_watcher, catalog_bucket_sizes
 import pandas as pd
 from io import BytesIO
-from main_processor_input import load_excel_data, extract_serial_numbers
-from openaispecsheetsearch import get_component_model_from_partnumber
+from main_processor_input import (stream_bom, iterate_in_thread, extract_serial_numbers_stream, RowDeduper,
+                                  IncompleteExtraction,
+                                  bom_fingerprint, bom_cache, serial_chunk_cache)
+from openaispecsheetsearch import get_component_model_from_partnumber_async, partnumber_cache
 import json
+import asyncio
+from typing import List, Dict
 from fastapi.middleware.cors import CORSMiddleware
+import os
 import traceback
-from othertowürth import process_parsed_component
+from othertowürth import process_parsed_component_async, translation_cache
 
 app = FastAPI()
 partnumbers = {}
+# Translated sources of matched parts, re-ranked by /find-components/rerank
+match_sources = {}
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:5173"],  # oder "*" für alle Domains (unsicher in Produktion)
@@ -20,25 +28,64 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+@app.on_event("startup")
+def watch_catalog():
+    interval = os.getenv("MATCH_WATCH_INTERVAL")
+    if interval:
+        start_catalog_watcher(float(interval))
+
 @app.post("/parse-excel")
 async def parse_excel(file: UploadFile = File(...)):
     if not file.filename.endswith((".xls", ".xlsx")):
         raise HTTPException(status_code=400, detail="Bitte lade eine gültige Excel-Datei hoch.")
 
     try:
-        content = await file.read()
-        rows = load_excel_data(content)
-        if not rows:
+        # A re-uploaded BOM is answered from the cache by the hash of its bytes
+        key = await run_in_threadpool(bom_fingerprint, file.file)
+        cached = await run_in_threadpool(bom_cache.get, key)
+        if cached is not None:
+            return cached
+
+        # Read straight from the spooled upload; the rows are streamed into the extraction
+        partnumbers = []
+        seen_rows = False
+
+        async def row_batches():
+            nonlocal seen_rows
+            async for kind, items in iterate_in_thread(stream_bom(file.file)):
+                seen_rows = True
+                if kind == "partnumbers":
+                    partnumbers.extend(items)
+                else:
+                    # Only sheets without a recognizable part number column go through the LLM
+                    yield items
+
+        # Repeated rows reach the LLM once; the deduper maps its results back to the designators
+        deduper = RowDeduper()
+        incomplete = None
+        try:
+            extracted = await extract_serial_numbers_stream(row_batches(), deduper=deduper)
+        except IncompleteExtraction as e:
+            extracted, incomplete = e.serial_numbers, e
+        if not seen_rows:
             raise HTTPException(status_code=400, detail="Keine BOM-Daten in der Excel-Datei gefunden.")
-        serial_numbers = extract_serial_numbers(rows)
-        return {"partnumbers": serial_numbers}
+        serial_numbers = list(dict.fromkeys(partnumbers + extracted))
+        result = {"partnumbers": serial_numbers, "designators": deduper.attribute(extracted)}
+        if incomplete is not None:
+            # A partial list is returned as such and never cached, so the next upload tries again
+            result["incomplete"] = True
+            result["detail"] = f"{incomplete.failed} von {incomplete.total} Abschnitten konnten nicht ausgewertet werden."
+            return result
+        await run_in_threadpool(bom_cache.set, key, result)
+        return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Fehler beim Verarbeiten der Datei: {str(e)}")
     
 @app.get("/identify-part")
-async def identify_part(partnumber: str):
+async def identify_part(partnumber: str, refresh: bool = False):
     try:
-        result = get_component_model_from_partnumber(partnumber)
+        result = await get_component_model_from_partnumber_async(partnumber, refresh=refresh)
         response = {
             "id": partnumber,
             "partNumber": partnumber,
@@ -60,13 +107,40 @@ async def identify_part(partnumber: str):
         return JSONResponse(content=error_response, status_code=200)
 
 
-@app.post("/find-components")
-def find_components(partnumber: str):
-    part = partnumbers.get(partnumber)
-    source = process_parsed_component(part)
-    matches = match_wuerth_components(source, top_k=5)
+@app.get("/cache-stats")
+def cache_stats():
+    return {
+        "partnumbers": partnumber_cache.stats(),
+        "translations": translation_cache.stats(),
+        "bom_results": bom_cache.stats(),
+        "serial_chunks": serial_chunk_cache.stats()
+    }
+
+
+@app.get("/catalog-stats")
+def catalog_stats():
+    state = current_state()
+    bucket_sizes = catalog_bucket_sizes(state)
+    return {
+        "catalog_version": state.version,
+        "total": sum(size for families in bucket_sizes.values() for size in families.values()),
+        "buckets": bucket_sizes,
+        "bounded_scoring": state.engine.bound_stats()
+    }
+
+
+@app.post("/admin/reload-catalog")
+def reload_catalog_endpoint():
+    started = reload_catalog() is not None
+    return {
+        "status": "reloading" if started else "already_reloading",
+        "catalog_version": current_state().version
+    }
 
+
+def build_match_response(source, matches, state):
     json_response = {
+        "catalog_version": state.version,
         "part_competitor": {
             "id": "123456789",
             "manufacturer": "Siemens",
@@ -83,46 +157,87 @@ def find_components(partnumber: str):
 
     json_response["wuerth_suggestions"] = []
 
-    for match_component, _ in matches:
+    for match_component, score, breakdown in matches:
         suggestion = {
             "Order_Code": match_component.get("Order_Code"),
-            "specs": []
+            "score": score,
+            "specs": [
+                {
+                    "attribute": entry["attribute"],
+                    "values": entry["values"],
+                    "rule_outcome": entry["outcome"],
+                    "operator": entry["operator"],
+                    "score": entry["score"]
+                } for entry in breakdown if entry["outcome"] != "missing"
+            ]
         }
 
-        for rule in rules.get_rules_for(source["Product_Group"], source["Product_Family"]):
-            attr_keys = rule.attribute_key if isinstance(rule.attribute_key, list) else [rule.attribute_key]
+        json_response["wuerth_suggestions"].append(suggestion)
 
-            for attr in attr_keys:
-                source_value = source.get(attr)
-                match_value = match_component.get(attr)
+    return json_response
 
-                if source_value is None or match_value is None:
-                    continue
 
-                outcome = "failed"
+@app.post("/find-components")
+async def find_components(partnumber: str, refresh: bool = False):
+    part = partnumbers.get(partnumber)
+    # The first request after start loads the catalog; do that off the event loop
+    state = await run_in_threadpool(current_state)
+    source = normalize_source(await process_parsed_component_async(part, refresh=refresh), state)
+    # Matching is CPU-bound; keep it off the event loop so LLM calls keep flowing
+    matches = await run_in_threadpool(
+        match_wuerth_components, source, top_k=5, state=state, explain=True, keep_scores=True
+    )
+    match_sources[partnumber] = source
 
-                if isinstance(source_value, (int, float)) and isinstance(match_value, (int, float)):
-                    # Consider operator semantics
-                    if rule.operator_str == "=":
-                        diff = abs(source_value - match_value) / max(abs(source_value), 1)
-                        if diff < 0.15:
-                            outcome = "tolerated"
-                    elif rule.operator_str == ">=":
-                        outcome = "good" if match_value >= source_value else "failed"
-                    elif rule.operator_str == "<=":
-                        outcome = "good" if match_value <= source_value else "failed"
-                else:
-                    # fallback to equality check for non-numeric
-                    if source_value == match_value:
-                        outcome = "good"
+    return build_match_response(source, matches, state)
 
-                suggestion["specs"].append({
-                    "attribute": attr,
-                    "values": [match_value, source_value],
-                    "rule_outcome": outcome,
-                    "operator": rule.operator_str
-                })
 
-        json_response["wuerth_suggestions"].append(suggestion)
+@app.post("/find-components/rerank")
+def rerank_components_endpoint(partnumber: str = Body(...), weights: Dict[str, float] = Body(...), top_k: int = Body(5)):
+    source = match_sources.get(partnumber)
+    if source is None:
+        raise HTTPException(status_code=404, detail="Part has not been matched yet.")
 
-    return json_response
\ No newline at end of file
+    state = current_state()
+    try:
+        matches = rerank_components(source, weights, top_k=top_k, state=state, explain=True)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return build_match_response(source, matches, state)
+
+
+@app.post("/find-components/batch")
+async def find_components_batch(part_numbers: List[str] = Body(...)):
+    state = await run_in_threadpool(current_state)
+    results = {}
+    sources = {}
+
+    async def translate(partnumber):
+        try:
+            part = partnumbers.get(partnumber)
+            if part is None:
+                raise ValueError("Part has not been identified yet.")
+            source = normalize_source(await process_parsed_component_async(part), state)
+            state.validate_source(source)
+            return source
+        except Exception as e:
+            print("❌ Fehler beim Übersetzen:", traceback.format_exc())
+            results[partnumber] = {"partnumber": partnumber, "status": "failed", "error": str(e)}
+            return None
+
+    # Translations run concurrently, bounded by LLM_CONCURRENCY
+    unique = list(dict.fromkeys(part_numbers))
+    translated = await asyncio.gather(*(translate(partnumber) for partnumber in unique))
+    for partnumber, source in zip(unique, translated):
+        if source is not None:
+            sources[partnumber] = source
+
+    matched = await run_in_threadpool(match_many, list(sources.values()), top_k=5, state=state, explain=True)
+    for (partnumber, source), matches in zip(sources.items(), matched):
+        results[partnumber] = {"partnumber": partnumber, "status": "matched", **build_match_response(source, matches, state)}
+
+    return {
+        "catalog_version": state.version,
+        "results": [results[partnumber] for partnumber in dict.fromkeys(part_numbers)]
+    }
@@ -0,0 +1,161 @@
+"""Persistent cache for LLM results, shared by every worker through one SQLite file.
+
+Each PersistentCache is one table in the database with an in-process LRU in
+front. Values are stored as JSON with their creation time; entries older than
+the TTL count as misses and are replaced on the next set(). With max_entries
+the table is bounded: each row records when it was last read or written from
+disk, and set() evicts the least recently used rows beyond the bound.
+
+CachedLLMCall wraps the lookup, LLM call and store steps around such a cache
+the same way for sync and async callers.
+"""
+import os
+import asyncio
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(os.path.dirname(__file__), "cache", "llm_cache.sqlite3"))
+
+
+class PersistentCache:
+    def __init__(self, table: str, ttl: Optional[float] = None, lru_size: int = 1024, path: str = CACHE_PATH,
+                 max_entries: Optional[int] = None):
+        if not table.isidentifier():
+            raise ValueError(f"Invalid cache table name {table!r}.")
+        self.table = table
+        self.ttl = ttl
+        self.lru_size = lru_size
+        self.max_entries = max_entries
+        self.path = path
+        self._lru: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "expired": 0, "writes": 0, "evicted": 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as connection:
+            # WAL lets the API workers read while one of them writes
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            # Tables created before the size bound existed lack the recency column
+            columns = {row[1] for row in connection.execute(f"PRAGMA table_info({table})")}
+            if "used_at" not in columns:
+                connection.execute(f"ALTER TABLE {table} ADD COLUMN used_at REAL")
+                connection.execute(f"UPDATE {table} SET used_at = created_at")
+            connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_used_at ON {table} (used_at)")
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def _fresh(self, created_at: float) -> bool:
+        return self.ttl is None or time.time() - created_at < self.ttl
+
+    def _remember(self, key: str, value: Any, created_at: float):
+        with self._lock:
+            self._lru[key] = (value, created_at)
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.lru_size:
+                self._lru.popitem(last=False)
+
+    def get(self, key: str) -> Optional[Any]:
+        """The cached value for key, or None when it is missing or older than the TTL."""
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                if self._fresh(entry[1]):
+                    self._lru.move_to_end(key)
+                    self.counters["memory_hits"] += 1
+                    return entry[0]
+                del self._lru[key]
+
+        with self._connect() as connection:
+            row = connection.execute(f"SELECT value, created_at FROM {self.table} WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.max_entries is not None:
+                connection.execute(f"UPDATE {self.table} SET used_at = ? WHERE key = ?", (time.time(), key))
+        if row is None:
+            self.counters["misses"] += 1
+            return None
+        value, created_at = json.loads(row[0]), row[1]
+        if not self._fresh(created_at):
+            self.counters["expired"] += 1
+            return None
+
+        self.counters["disk_hits"] += 1
+        self._remember(key, value, created_at)
+        return value
+
+    def set(self, key: str, value: Any):
+        created_at = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, created_at, used_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), created_at, created_at)
+            )
+            if self.max_entries is not None:
+                evicted = connection.execute(
+                    f"DELETE FROM {self.table} WHERE key IN "
+                    f"(SELECT key FROM {self.table} ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                ).rowcount
+                self.counters["evicted"] += max(evicted, 0)
+        self.counters["writes"] += 1
+        self._remember(key, value, created_at)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._lru.pop(key, None)
+        with self._connect() as connection:
+            connection.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def stats(self) -> Dict[str, Any]:
+        with self._connect() as connection:
+            entries = connection.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        lookups = hits + self.counters["misses"] + self.counters["expired"]
+        return {
+            **self.counters,
+            "hit_rate": round(hits / lookups, 4) if lookups else None,
+            "entries": entries,
+            "memory_entries": len(self._lru),
+            "ttl": self.ttl,
+            "max_entries": self.max_entries,
+        }
+
+
+class CachedLLMCall:
+    """Lookup, LLM call and store steps of a cached LLM result.
+
+    lookup(*args, refresh) returns (result, key): a result found without the
+    LLM (decoded locally or cached), or None and the key to store the answer
+    under. store(key, result, *args) caches the LLM answer and returns what the
+    caller gets.
+    """
+
+    def __init__(self, lookup: Callable[..., Tuple[Any, Optional[str]]], store: Callable[..., Any]):
+        self.lookup = lookup
+        self.store = store
+
+    def run(self, call: Callable[..., Any], *args, refresh: bool = False):
+        result, key = self.lookup(*args, refresh)
+        if result is None:
+            result = self.store(key, call(*args), *args)
+        return result
+
+    async def run_async(self, call: Callable[..., Awaitable[Any]], *args, refresh: bool = False):
+        # SQLite may wait on another worker's write lock; keep that off the event loop
+        result, key = await asyncio.to_thread(self.lookup, *args, refresh)
+        if result is None:
+            result = await asyncio.to_thread(self.store, key, await call(*args), *args)
+        return result
@@ -0,0 +1,54 @@
+"""Shared OpenAI clients and the concurrency limit for LLM calls.
+
+The clients are created once and keep pooled HTTP connections. The async
+client and the semaphore belong to an event loop, so there is one per running
+loop, which under uvicorn means one per worker process. LLM_CONCURRENCY bounds
+how many async LLM calls a process runs at once.
+"""
+import os
+import asyncio
+import threading
+import weakref
+
+import httpx
+from openai import OpenAI, AsyncOpenAI, DefaultHttpxClient, DefaultAsyncHttpxClient
+
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", 8))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", 20))
+
+_sync_client = None
+_sync_lock = threading.Lock()
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, AsyncOpenAI]" = weakref.WeakKeyDictionary()
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_CONNECTIONS)
+
+
+def sync_client() -> OpenAI:
+    global _sync_client
+    if _sync_client is None:
+        with _sync_lock:
+            if _sync_client is None:
+                _sync_client = OpenAI(http_client=DefaultHttpxClient(limits=_limits()))
+    return _sync_client
+
+
+def async_client() -> AsyncOpenAI:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = AsyncOpenAI(http_client=DefaultAsyncHttpxClient(limits=_limits()))
+        _async_clients[loop] = client
+    return client
+
+
+def llm_slot() -> asyncio.Semaphore:
+    """Semaphore to hold while an async LLM call is in flight: async with llm_slot(): ..."""
+    loop = asyncio.get_running_loop()
+    semaphore = _semaphores.get(loop)
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(LLM_CONCURRENCY)
+        _semaphores[loop] = semaphore
+    return semaphore
@@ -1,12 +1,20 @@
 import os
-import pandas as pd
+import re
+import zlib
+import asyncio
+import hashlib
+import threading
+import itertools
+from io import BytesIO
 from dotenv import load_dotenv
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator, AsyncIterator, Optional, Sequence, Tuple, Union, BinaryIO
 
 from langchain_openai import AzureChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel
 
+from llm_cache import PersistentCache
+
 # --- Load Environment ---
 env_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'env')
 load_dotenv(dotenv_path=env_path, override=True)
@@ -16,6 +24,32 @@ AZURE_API_VERSION = os.getenv("AZURE_API_VERSION")
 AZURE_API_KEY = os.getenv("AZURE_API_KEY")
 AZURE_MODEL_NAME = "gpt-4o"
 
+# Serial number extraction: prompt tokens per chunk, chunks in flight, retries per chunk
+SERIAL_CHUNK_TOKENS = int(os.getenv("SERIAL_CHUNK_TOKENS", 6000))
+SERIAL_CHUNK_CONCURRENCY = int(os.getenv("SERIAL_CHUNK_CONCURRENCY", 8))
+SERIAL_CHUNK_RETRIES = int(os.getenv("SERIAL_CHUNK_RETRIES", 2))
+
+# Header sniffing: rows searched for a header, rows sampled per sheet, and the column score needed to skip the LLM
+HEADER_SCAN_ROWS = 10
+SNIFF_ROWS = 200
+MPN_CONFIDENCE = float(os.getenv("MPN_CONFIDENCE", 0.75))
+
+# Streaming reader: rows per batch handed from the Excel reader to the chunking stage
+BOM_BATCH_ROWS = int(os.getenv("BOM_BATCH_ROWS", 500))
+
+# Result caches: whole uploads by file hash, extracted chunks by markdown hash (LRU-bounded on disk)
+BOM_CACHE_SIZE = int(os.getenv("BOM_CACHE_SIZE", 500))
+SERIAL_CHUNK_CACHE_SIZE = int(os.getenv("SERIAL_CHUNK_CACHE_SIZE", 20000))
+bom_cache = PersistentCache("bom_results", lru_size=64, max_entries=BOM_CACHE_SIZE)
+serial_chunk_cache = PersistentCache("serial_chunks", lru_size=1024, max_entries=SERIAL_CHUNK_CACHE_SIZE)
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:
+    # tiktoken is optional; without it a token is estimated as four characters
+    _encoding = None
+
 # --- Initialize LLM ---
 llm = AzureChatOpenAI(
     azure_endpoint=AZURE_ENDPOINT,
@@ -36,45 +70,491 @@ structured_llm = llm.with_structured_output(
     include_raw=False
 )
 
+SERIAL_PROMPT = (
+    "You are an expert in electronic components. For each row in the following Markdown BOM table, "
+    "identify the component and extract a concise identifier for it. "
+    "Return a list of serial numbers, one per component, that uniquely represents each component row. "
+    "Do not include any other information or explanations. Just serial numbers longer than 5 characters. "
+)
+
 prompt = ChatPromptTemplate.from_messages([
-    (
-        "system",
-        "You are an expert in electronic components. For each row in the following Markdown BOM table, "
-        "identify the component and extract a concise identifier for it. "
-        "Return a list of serial numbers, one per component, that uniquely represents each component row. "
-        "Do not include any other information or explanations. Just serial numbers longer than 5 characters. "
-    ),
+    ("system", SERIAL_PROMPT),
     ("human", "{markdown_chunk}")
 ])
 
+# Cached extractions are only valid for the model, prompt and column threshold that produced them
+EXTRACTION_FINGERPRINT = hashlib.sha256(
+    f"{AZURE_MODEL_NAME}\n{SERIAL_PROMPT}\n{MPN_CONFIDENCE}".encode("utf-8")
+).hexdigest()
+
 chain = prompt | structured_llm
 
 # --- Helpers ---
-def load_excel_data(file_bytes: bytes) -> List[Dict[str, Any]]:
-    excel_data = pd.read_excel(file_bytes, sheet_name=None)
-    all_rows = []
-    for df in excel_data.values():
-        df = df.fillna('')
-        all_rows.extend(df.to_dict('records'))
-    return all_rows
-
-def chunk_rows(data: List[Dict[str, Any]], chunk_size: int) -> List[List[Dict[str, Any]]]:
-    return [data[i:i + chunk_size] for i in range(0, len(data), chunk_size)]
-
-def extract_serial_numbers(data: List[Dict[str, Any]], chunk_size: int = 200) -> List[str]:
-    row_chunks = chunk_rows(data, chunk_size)
-    serials = []
-
-    for idx, chunk in enumerate(row_chunks):
-        print(f"🔄 Processing chunk {idx + 1}/{len(row_chunks)}...")
-        markdown_chunk = pd.DataFrame(chunk).to_markdown(index=False)
+# Header words: manufacturer part number columns score high, distributor and description columns not at all
+MPN_HEADERS = {
+    "mpn", "manufacturer part number", "manufacturer part no", "manufacturer pn", "mfr part number",
+    "mfr part no", "mfr pn", "mfr #", "mfg part number", "mfg part no", "mfg pn", "hersteller teilenummer",
+    "herstellerteilenummer", "hersteller artikelnummer", "partnumber", "manufacturer partnumber",
+}
+_MAKER_WORDS = {"manufacturer", "manufacturers", "mfr", "mfg", "hersteller"}
+_PART_WORDS = {"part", "partnumber", "pn", "number", "no", "nr", "#", "teilenummer", "artikelnummer"}
+_EXCLUDED_WORDS = {
+    "description", "designator", "designators", "reference", "ref", "qty", "quantity", "value", "name",
+    "footprint", "package", "supplier", "distributor", "digikey", "mouser", "farnell", "order", "internal",
+    "beschreibung", "menge",
+}
+# Columns that never identify a part; designator columns are kept aside to attribute the results
+_NOISE_WORDS = {"qty", "quantity", "menge", "anzahl", "price", "preis", "cost", "stock", "lager"}
+_NOISE_HEADERS = {"item", "pos", "position", "line", "#", "no", "nr", "ve", "lz", "total"}
+_DESIGNATOR_WORDS = {"designator", "designators", "reference", "references", "ref", "refdes", "referenz"}
+_DESIGNATOR_PATTERN = re.compile(r"^[A-Z]{1,5}\d+[A-Z0-9_]*(?:-[A-Z]*\d+)?$")
+_MPN_PATTERN = re.compile(r"^(?=.*\d)[A-Z0-9][A-Z0-9\-_/.#+]{4,39}$")
+_CELL_SEPARATORS = re.compile(r"[\r\n;]+")
+
+def _cell_text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float):
+        if value != value:
+            return ""
+        if value.is_integer():
+            # Numeric part numbers (e.g. Würth order codes) are read as floats
+            return str(int(value))
+    return str(value).strip()
+
+def _cell_value(value):
+    # Empty cells become '' like fillna('') did; xlrd reads every number as float
+    if isinstance(value, float) and value == value and value.is_integer():
+        return int(value)
+    return "" if _cell_text(value) == "" else value
+
+def iter_sheet_rows(source: Union[bytes, BinaryIO], batch_size: int = BOM_BATCH_ROWS) -> Iterator[Tuple[str, List[tuple]]]:
+    """(sheet name, batch of raw row tuples) for every sheet, read incrementally.
+
+    .xlsx files are read with openpyxl in read-only mode, which streams the sheet XML
+    out of the zip; .xls files with xlrd on_demand, which loads one sheet at a time.
+    source is the upload as bytes or a seekable binary file.
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+    source.seek(0)
+    magic = source.read(8)
+    source.seek(0)
+
+    if magic.startswith(b"PK"):
+        import openpyxl
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        try:
+            for sheet in workbook.worksheets:
+                batch = []
+                for row in sheet.iter_rows(values_only=True):
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        yield sheet.title, batch
+                        batch = []
+                if batch:
+                    yield sheet.title, batch
+        finally:
+            workbook.close()
+    else:
+        import xlrd
+        # BIFF needs random access, so the .xls upload is read whole; the format caps sheets at 65,536 rows
+        workbook = xlrd.open_workbook(file_contents=source.read(), on_demand=True)
+        try:
+            for name in workbook.sheet_names():
+                sheet = workbook.sheet_by_name(name)
+                for start in range(0, sheet.nrows, batch_size):
+                    yield name, [tuple(sheet.row_values(i)) for i in range(start, min(start + batch_size, sheet.nrows))]
+                workbook.unload_sheet(name)
+        finally:
+            workbook.release_resources()
+
+def _is_empty(row: Sequence) -> bool:
+    return all(_cell_text(value) == "" for value in row)
+
+def _header_words(value) -> str:
+    return re.sub(r"[^a-z0-9#]+", " ", _cell_text(value).lower()).strip()
+
+def _header_score(value) -> float:
+    header = _header_words(value)
+    if not header:
+        return 0.0
+    if header in MPN_HEADERS:
+        return 1.0
+    words = set(header.split())
+    if words & _EXCLUDED_WORDS:
+        return 0.0
+    if words & _MAKER_WORDS and words & _PART_WORDS:
+        return 0.9
+    if "part" in words and words & _PART_WORDS - {"part"}:
+        return 0.7
+    return 0.0
+
+def _part_numbers(value) -> List[str]:
+    return [text.strip() for text in _CELL_SEPARATORS.split(_cell_text(value))
+            if _MPN_PATTERN.match(text.strip().upper())]
+
+def _cell(row: Sequence, column: int):
+    return row[column] if column < len(row) else None
+
+def detect_mpn_column(rows: List[Sequence]):
+    """(header row, column, confidence) of the manufacturer part number column, or None when unsure.
+
+    rows are the first rows of a sheet, header included. Every cell of the first
+    HEADER_SCAN_ROWS rows is scored by its name and the share of cells below it
+    that look like part numbers.
+    """
+    best = None
+    for row in range(min(HEADER_SCAN_ROWS, len(rows))):
+        for column in range(len(rows[row])):
+            name_score = _header_score(rows[row][column])
+            if not name_score:
+                continue
+            values = [v for v in (_cell_text(_cell(r, column)) for r in rows[row + 1:]) if v]
+            if not values:
+                continue
+            value_score = sum(bool(_part_numbers(v)) for v in values) / len(values)
+            score = 0.6 * name_score + 0.4 * value_score
+            if best is None or score > best[2]:
+                best = (row, column, score)
+    return best if best is not None and best[2] >= MPN_CONFIDENCE else None
+
+def _column_names(header: Sequence) -> List[str]:
+    """Column names of a header row, named like pandas names them ("Unnamed: n", "name.1")."""
+    columns, seen = [], {}
+    for i, value in enumerate(header):
+        name = _cell_text(value) or f"Unnamed: {i}"
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
+
+def _sheets(source, batch_size: int) -> Iterator[Tuple[str, List[tuple], Iterator[List[tuple]]]]:
+    """(sheet name, first SNIFF_ROWS non-empty rows, iterator over the sheet's remaining row batches)."""
+    for name, batches in itertools.groupby(iter_sheet_rows(source, batch_size), key=lambda item: item[0]):
+        rows = (row for _, batch in batches for row in batch if not _is_empty(row))
+        head = list(itertools.islice(rows, SNIFF_ROWS))
+        yield name, head, iter(lambda: list(itertools.islice(rows, batch_size)), [])
+
+def stream_bom(source: Union[bytes, BinaryIO], batch_size: int = BOM_BATCH_ROWS) -> Iterator[Tuple[str, List[Any]]]:
+    """("partnumbers", [...]) and ("rows", [...]) batches of an Excel BOM, sheet by sheet.
+
+    Sheets with a confident MPN column (see detect_mpn_column) yield their part numbers;
+    the other sheets yield row dicts for the LLM extraction. Empty rows and repeated
+    header rows are dropped on the way, and only one batch per sheet is held at a time.
+    """
+    for name, head, rest in _sheets(source, batch_size):
+        if not head:
+            continue
+        detected = detect_mpn_column(head)
+        if detected is not None:
+            header_row, column, confidence = detected
+            print(f"🔎 Sheet {name}: part numbers in column {head[header_row][column]!r} ({confidence:.2f})")
+            partnumbers = [pn for row in head[header_row + 1:] for pn in _part_numbers(_cell(row, column))]
+            if partnumbers:
+                yield "partnumbers", partnumbers
+            for batch in rest:
+                partnumbers = [pn for row in batch for pn in _part_numbers(_cell(row, column))]
+                if partnumbers:
+                    yield "partnumbers", partnumbers
+            continue
+
+        header = head[0]
+        columns = _column_names(header)
+        header_text = [_cell_text(value) for value in header]
+
+        def records(rows):
+            return [dict(zip(columns, map(_cell_value, row))) for row in rows
+                    if [_cell_text(value) for value in row] != header_text]
+
+        for batch in itertools.chain([head[1:]], rest):
+            rows = records(batch)
+            if rows:
+                yield "rows", rows
+
+def bom_fingerprint(source: Union[bytes, BinaryIO]) -> str:
+    """bom_cache key of an upload: hash of its bytes and the extraction fingerprint.
+
+    A file object is read in blocks and rewound, so it can be streamed afterwards.
+    """
+    digest = hashlib.sha256(EXTRACTION_FINGERPRINT.encode("ascii"))
+    if isinstance(source, (bytes, bytearray)):
+        digest.update(source)
+    else:
+        for block in iter(lambda: source.read(1 << 20), b""):
+            digest.update(block)
+        source.seek(0)
+    return digest.hexdigest()
+
+def estimate_tokens(text: str) -> int:
+    if _encoding is not None:
+        return len(_encoding.encode(text))
+    return len(text) // 4 + 1
+
+def _markdown_line(values) -> str:
+    return "| " + " | ".join(str(v).replace("|", "/").replace("\n", " ") for v in values) + " |"
+
+class RowDeduper:
+    """Normalizes BOM rows and collapses rows with the same part-relevant content.
+
+    Quantity, price and position columns are dropped and designator columns set
+    aside, cells are whitespace-normalized, and rows whose remaining cells match
+    case-insensitively are passed on once. The designators of every collapsed row
+    are kept, so attribute() can map extracted serial numbers back to them.
+    """
+
+    def __init__(self):
+        self.keys: Dict[tuple, int] = {}
+        self.designators: List[List[str]] = []
+        self.tokens: Dict[str, List[int]] = {}
+        self.texts: List[str] = []
+        self.layouts: Dict[tuple, Tuple[List[str], List[str]]] = {}
+        self.rows_in = 0
+
+    def _layout(self, columns: tuple) -> Tuple[List[str], List[str]]:
+        layout = self.layouts.get(columns)
+        if layout is None:
+            kept, designators = [], []
+            for column in columns:
+                header = _header_words(column)
+                words = set(header.split())
+                if words & _DESIGNATOR_WORDS:
+                    designators.append(column)
+                elif not (words & _NOISE_WORDS or header in _NOISE_HEADERS):
+                    kept.append(column)
+            layout = self.layouts[columns] = (kept, designators)
+        return layout
+
+    def add(self, rows: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """The rows not seen before, reduced to their normalized identifying columns."""
+        unique = []
+        for row in rows:
+            self.rows_in += 1
+            kept, designator_columns = self._layout(tuple(row))
+            values = {column: " ".join(_cell_text(row[column]).split()) for column in kept}
+            if not any(values.values()):
+                continue
+            designators = [token for column in designator_columns
+                           for token in re.split(r"[,;\s]+", _cell_text(row[column]).upper())
+                           if _DESIGNATOR_PATTERN.match(token)]
+
+            key = (tuple(kept), tuple(value.casefold() for value in values.values()))
+            idx = self.keys.get(key)
+            if idx is not None:
+                self.designators[idx].extend(designators)
+                continue
+            idx = self.keys[key] = len(self.designators)
+            self.designators.append(designators)
+            self.texts.append(" ".join(key[1]))
+            for token in set(" ".join(key[1]).split()):
+                self.tokens.setdefault(token, []).append(idx)
+            unique.append(values)
+        return unique
+
+    def attribute(self, serials: Iterable[str]) -> Dict[str, List[str]]:
+        """Designators of the rows each serial number was found in."""
+        result = {}
+        for serial in serials:
+            needle = serial.casefold()
+            rows = self.tokens.get(needle)
+            if rows is None:
+                rows = [idx for idx, text in enumerate(self.texts) if needle in text]
+            result[serial] = list(dict.fromkeys(d for idx in rows for d in self.designators[idx]))
+        return result
+
+def render_markdown(rows: List[Dict[str, Any]]) -> str:
+    """Markdown table of rows without column padding, so its size is the sum of its lines.
+
+    Columns that are empty in every row are left out.
+    """
+    columns = [column for column in dict.fromkeys(key for row in rows for key in row)
+               if any(_cell_text(row.get(column)) for row in rows)]
+    lines = [_markdown_line(columns), _markdown_line("---" for _ in columns)]
+    lines.extend(_markdown_line(row.get(column, "") for column in columns) for row in rows)
+    return "\n".join(lines)
+
+class RowChunker:
+    """Packs rows into consecutive chunks whose markdown stays within token_budget and chunk_size rows.
+
+    Rows are added batch by batch and full chunks come out as soon as they fill, so
+    the first chunk can be sent while the rest of the BOM is still being read. A row
+    with different columns (a new sheet) starts a new chunk.
+
+    Chunks also end after rows whose content hash hits 1 in `boundary`, so the cuts
+    depend on the rows around them rather than on their position: editing a row of
+    a re-uploaded BOM changes its own chunk, and the others hit serial_chunk_cache.
+    """
+
+    def __init__(self, chunk_size: int = 200, token_budget: int = SERIAL_CHUNK_TOKENS,
+                 boundary: Optional[int] = None):
+        self.chunk_size = chunk_size
+        self.token_budget = token_budget
+        self.boundary = boundary or max(chunk_size // 2, 1)
+        self.min_rows = max(chunk_size // 8, 1)
+        self.current: List[Dict[str, Any]] = []
+        self.columns = None
+        self.used = 0
+
+    def add(self, rows: Iterable[Dict[str, Any]]) -> List[List[Dict[str, Any]]]:
+        chunks = []
+        for row in rows:
+            columns = list(row)
+            if columns != self.columns:
+                chunks.extend(self.flush())
+                self.columns = columns
+                self.used = 2 * estimate_tokens(_markdown_line(columns))
+            line = _markdown_line(row.values())
+            cost = estimate_tokens(line)
+            if self.current and (self.used + cost > self.token_budget or len(self.current) >= self.chunk_size):
+                chunks.extend(self.flush())
+                self.used = 2 * estimate_tokens(_markdown_line(columns))
+            self.current.append(row)
+            self.used += cost
+            if len(self.current) >= self.min_rows and zlib.crc32(line.encode("utf-8")) % self.boundary == 0:
+                chunks.extend(self.flush())
+                self.used = 2 * estimate_tokens(_markdown_line(columns))
+        return chunks
+
+    def flush(self) -> List[List[Dict[str, Any]]]:
+        chunk, self.current = self.current, []
+        return [chunk] if chunk else []
+
+def chunk_rows(data: List[Dict[str, Any]], chunk_size: int = 200,
+               token_budget: int = SERIAL_CHUNK_TOKENS) -> List[List[Dict[str, Any]]]:
+    """Consecutive chunks of rows whose markdown stays within token_budget and chunk_size rows.
+
+    chunk_size also bounds the answer, which has one serial number per row.
+    """
+    chunker = RowChunker(chunk_size, token_budget)
+    return chunker.add(data) + chunker.flush()
+
+async def iterate_in_thread(iterator: Iterator, maxsize: int = 2) -> AsyncIterator:
+    """Items of a blocking iterator produced in a worker thread.
+
+    The queue holds at most maxsize items, so the reader never runs far ahead of the consumer.
+    """
+    loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize)
+    stop = threading.Event()
+    done = object()
+
+    def produce():
         try:
-            response = chain.invoke({"markdown_chunk": markdown_chunk})
-            filtered_serials = [s for s in response.serial_numbers if len(s) >= 5]
-            serials.extend(filtered_serials)
-            serials.extend(response.serial_numbers)
+            for item in iterator:
+                if stop.is_set():
+                    return
+                asyncio.run_coroutine_threadsafe(queue.put((item, None)), loop).result()
+            asyncio.run_coroutine_threadsafe(queue.put((done, None)), loop).result()
         except Exception as e:
-            print(f"❌ Error in chunk {idx + 1}: {e}")
-            
+            asyncio.run_coroutine_threadsafe(queue.put((done, e)), loop).result()
+
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item, error = await queue.get()
+            if error is not None:
+                raise error
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+        # Let a producer blocked on a full queue finish its put and see the stop flag
+        while not producer.done():
+            while not queue.empty():
+                queue.get_nowait()
+            await asyncio.sleep(0.01)
+
+class IncompleteExtraction(Exception):
+    """Some chunks were still failing after their retries; serial_numbers holds the rest."""
+
+    def __init__(self, failed: int, total: int, serial_numbers: List[str]):
+        super().__init__(f"{failed} of {total} BOM chunks could not be extracted")
+        self.failed = failed
+        self.total = total
+        self.serial_numbers = serial_numbers
+
+async def _extract_chunk(idx: int, chunk: List[Dict[str, Any]], semaphore: asyncio.Semaphore,
+                         retries: int) -> Optional[List[str]]:
+    markdown_chunk = render_markdown(chunk)
+    key = hashlib.sha256(f"{EXTRACTION_FINGERPRINT}\n{markdown_chunk}".encode("utf-8")).hexdigest()
+    cached = await asyncio.to_thread(serial_chunk_cache.get, key)
+    if cached is not None:
+        print(f"💾 Chunk {idx + 1} from cache")
+        return cached
+    for attempt in range(retries + 1):
+        try:
+            async with semaphore:
+                print(f"🔄 Processing chunk {idx + 1}...")
+                response = await chain.ainvoke({"markdown_chunk": markdown_chunk})
+            serials = [s for s in response.serial_numbers if len(s) >= 5]
+            await asyncio.to_thread(serial_chunk_cache.set, key, serials)
+            return serials
+        except Exception as e:
+            print(f"❌ Error in chunk {idx + 1} (attempt {attempt + 1}/{retries + 1}): {e}")
+            if attempt < retries:
+                await asyncio.sleep(2 ** attempt)
+    return None
+
+async def extract_serial_numbers_stream(row_batches: AsyncIterator[List[Dict[str, Any]]], chunk_size: int = 200,
+                                        token_budget: int = SERIAL_CHUNK_TOKENS,
+                                        concurrency: int = SERIAL_CHUNK_CONCURRENCY,
+                                        retries: int = SERIAL_CHUNK_RETRIES,
+                                        deduper: Optional[RowDeduper] = None) -> List[str]:
+    """Serial numbers of all rows, extracted while the batches are still arriving.
+
+    Rows go through deduper (a fresh RowDeduper unless one is passed in to attribute
+    the results afterwards), so repeated parts are sent to the model once.
+
+    Chunks are dispatched as soon as they fill, at most `concurrency` at a time; reading
+    waits while that many are in flight, so only those chunks are held in memory.
+    Results are merged in row order. A failing chunk is retried on its own; if any
+    chunk is still failing once its retries are spent, IncompleteExtraction is raised
+    with the serial numbers of the other chunks.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    chunker = RowChunker(chunk_size, token_budget)
+    deduper = deduper if deduper is not None else RowDeduper()
+    results: Dict[int, Optional[List[str]]] = {}
+    pending = set()
+    dispatched = 0
+
+    async def run(idx, chunk):
+        results[idx] = await _extract_chunk(idx, chunk, semaphore, retries)
+
+    async def dispatch(chunks):
+        nonlocal pending, dispatched
+        for chunk in chunks:
+            if len(pending) >= concurrency:
+                _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            pending.add(asyncio.create_task(run(dispatched, chunk)))
+            dispatched += 1
+
+    async for batch in row_batches:
+        await dispatch(chunker.add(deduper.add(batch)))
+    await dispatch(chunker.flush())
+    if pending:
+        await asyncio.gather(*pending)
+    if deduper.rows_in:
+        print(f"🧹 {deduper.rows_in} rows sent as {len(deduper.keys)} unique rows")
+
+    serials = [serial for idx in sorted(results) for serial in results[idx] or []]
     unique_serials = list(dict.fromkeys(serials))
-    return unique_serials
\ No newline at end of file
+    failed = sum(1 for result in results.values() if result is None)
+    if failed:
+        raise IncompleteExtraction(failed, len(results), unique_serials)
+    return unique_serials
+
+async def _single_batch(rows: List[Dict[str, Any]]):
+    yield rows
+
+async def extract_serial_numbers_async(data: List[Dict[str, Any]], chunk_size: int = 200, **kwargs) -> List[str]:
+    """Serial numbers of all rows; chunks run concurrently and are merged in row order."""
+    return await extract_serial_numbers_stream(_single_batch(data), chunk_size, **kwargs)
+
+def extract_serial_numbers(data: List[Dict[str, Any]], chunk_size: int = 200, **kwargs) -> List[str]:
+    """Blocking extract_serial_numbers_async for scripts; not for use inside a running event loop."""
+    return asyncio.run(extract_serial_numbers_async(data, chunk_size, **kwargs))
@@ -0,0 +1,465 @@
+"""Matching benchmark on synthetic Würth-like catalogs.
+
+    python -m matchmaking.benchmark --sizes 1000 10000 100000
+    python -m matchmaking.benchmark --sizes 1000 10000 --save-baseline
+    python -m matchmaking.benchmark --compare
+
+Every family in mappings.json gets a generated catalog of the requested size
+(rows per family) with realistic value distributions, E-series values, chip and
+inductor size codes and a share of missing optional attributes. Sources are
+parsed from the sample BOM CSVs where a family can be derived, plus perturbed
+copies of catalog rows so that every family is exercised.
+
+One family is generated, indexed and benchmarked at a time, so even 1M rows per
+family stays within memory. Latency is per call: one source for the match modes,
+one family's sources for the batch modes. Peak memory is the tracemalloc peak of
+one pass over a family's sources (worker processes are not included). The
+parallel modes run on a temporary snapshot of the family, since the process
+pool only shards snapshot-backed families.
+"""
+import os
+import sys
+import csv
+import glob
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Tuple, Optional
+
+import numpy as np
+
+from matchmaking import snapshot
+from matchmaking.matchmaking import (
+    CatalogIndex, Component, MatchingEngine, MatchingRules, SnapshotIndex,
+    code_attributes, load_rule_configs, normalize_attributes, numeric_attributes
+)
+from matchmaking.translation import translate_fields
+
+BASELINE_PATH = "matchmaking/benchmark_baseline.json"
+SAMPLE_BOM_GLOB = "sample bom results/*.csv"
+
+MODES = ["vectorized", "scalar", "bounded", "pruned", "footprint", "batch"]
+PARALLEL_MODES = ["parallel", "parallel-batch"]
+# Candidates taken from the footprint index in the footprint mode
+FOOTPRINT_NEIGHBOURS = 100
+
+E12 = [1.0, 1.2, 1.5, 1.8, 2.2, 2.7, 3.3, 3.9, 4.7, 5.6, 6.8, 8.2]
+E24 = [1.0, 1.1, 1.2, 1.3, 1.5, 1.6, 1.8, 2.0, 2.2, 2.4, 2.7, 3.0,
+       3.3, 3.6, 3.9, 4.3, 4.7, 5.1, 5.6, 6.2, 6.8, 7.5, 8.2, 9.1]
+
+# (case code, length, width, height) in mm
+CHIP_SIZES = [
+    ("0201", 0.6, 0.3, 0.3), ("0402", 1.0, 0.5, 0.5), ("0603", 1.6, 0.8, 0.8),
+    ("0805", 2.0, 1.25, 1.25), ("1206", 3.2, 1.6, 1.6), ("1210", 3.2, 2.5, 2.5),
+    ("2010", 5.0, 2.5, 0.6), ("2512", 6.3, 3.2, 0.6),
+]
+INDUCTOR_SIZES = [
+    ("2010", 2.0, 1.6, 1.0), ("3015", 3.0, 3.0, 1.5), ("4020", 4.0, 4.0, 2.0),
+    ("5030", 5.0, 5.0, 3.0), ("7030", 7.3, 7.3, 3.0), ("1040", 10.0, 10.0, 4.0),
+    ("1050", 10.0, 10.0, 5.0), ("1260", 12.0, 12.0, 6.0),
+]
+RADIAL_DIAMETERS = [4.0, 5.0, 6.3, 8.0, 10.0, 12.5, 16.0, 18.0]
+RADIAL_PITCHES = [1.5, 2.0, 2.5, 3.5, 5.0, 7.5]
+
+# Primary value range per attribute, with family overrides
+PRIMARY_RANGES = {
+    "Capacitance (µF)": {
+        None: (1e-6, 100.0),
+        "Aluminum Electrolytic Capacitors": (0.1, 22000.0),
+        "Aluminum Polymer Capacitors": (1.0, 2700.0),
+        "Aluminum Hybrid Polymer Capacitors": (10.0, 1000.0),
+        "Film Capacitors": (1e-4, 100.0),
+        "Supercapacitors (EDLCs)": (1e5, 1e8),
+    },
+    "Inductance (µH)": {None: (0.01, 1000.0)},
+    "Resistance (Ohm)": {None: (1.0, 1e7), "Metal Plate Resistors": (1e-4, 0.1)},
+}
+CHOICES = {
+    "Rated_Voltage (V)": [4.0, 6.3, 10.0, 16.0, 25.0, 35.0, 50.0, 63.0, 100.0, 160.0, 250.0, 400.0, 630.0],
+    "Rated_Power (W)": [0.05, 0.0625, 0.1, 0.125, 0.25, 0.5, 1.0, 2.0, 3.0],
+    "Operating_Temperature (°C) Minimum": [-55.0, -40.0, -25.0],
+    "Operating_Temperature (°C) Maximum": [85.0, 105.0, 125.0, 150.0, 155.0],
+}
+# (low, high, decimals) of log-uniform attributes
+LOG_RANGES = {
+    "Rated_Current (A)": (0.05, 40.0, 2),
+    "DC_Resistance (Ω)": (0.0005, 20.0, 4),
+    "Self_Resonant_Frequency (MHz)": (1.0, 2000.0, 1),
+}
+DIMENSION_ATTRIBUTES = {"Size_Code", "Length (mm)", "Width (mm)", "Height (mm)", "Diameter (mm)", "Pitch (mm)"}
+OPTIONAL_MISSING_SHARE = 0.1
+
+
+def family_attributes(family_mapping: Dict) -> Tuple[List[str], List[str]]:
+    """Catalog attribute names of a family: (core, optional), composite rules flattened."""
+    def flatten(section):
+        names = []
+        for attr in (family_mapping.get(section) or {}).values():
+            for name in (attr if isinstance(attr, list) else [attr]):
+                if name and name not in names:
+                    names.append(name)
+        return names
+    core = flatten("core")
+    return core, [name for name in flatten("optional") if name not in core]
+
+
+def _round(values: np.ndarray, significant: int = 3) -> np.ndarray:
+    magnitude = np.floor(np.log10(np.abs(values)))
+    scale = 10.0 ** (significant - 1 - magnitude)
+    return np.round(values * scale) / scale
+
+
+def _e_series(rng: np.random.Generator, n: int, low: float, high: float, series: List[float]) -> np.ndarray:
+    decades = rng.integers(int(np.floor(np.log10(low))), int(np.ceil(np.log10(high))), n, endpoint=True)
+    values = _round(rng.choice(series, n) * 10.0 ** decades)
+    return np.clip(values, low, high)
+
+
+def _log_uniform(rng: np.random.Generator, n: int, low: float, high: float, decimals: int) -> np.ndarray:
+    values = np.exp(rng.uniform(np.log(low), np.log(high), n))
+    return np.maximum(np.round(values, decimals), low)
+
+
+def _dimension_columns(rng: np.random.Generator, n: int, group: str, family: str,
+                       attributes: List[str]) -> Dict[str, List[Any]]:
+    if group == "Power Magnetics":
+        table = INDUCTOR_SIZES
+    elif group == "Resistors" or family.startswith("MLCC"):
+        table = CHIP_SIZES
+    else:
+        table = None
+
+    if table is not None:
+        picks = rng.integers(0, len(table), n)
+        sizes = {
+            "Size_Code": [table[p][0] for p in picks],
+            "Length (mm)": [table[p][1] for p in picks],
+            "Width (mm)": [table[p][2] for p in picks],
+            "Height (mm)": [table[p][3] for p in picks],
+        }
+    else:
+        diameters = rng.choice(RADIAL_DIAMETERS, n)
+        sizes = {
+            "Diameter (mm)": diameters.tolist(),
+            "Length (mm)": np.round(diameters * rng.uniform(1.0, 2.5, n), 1).tolist(),
+            "Width (mm)": np.round(diameters * rng.uniform(0.4, 1.0, n), 1).tolist(),
+            "Height (mm)": np.round(diameters * rng.uniform(0.8, 1.5, n), 1).tolist(),
+            "Pitch (mm)": rng.choice(RADIAL_PITCHES, n).tolist(),
+        }
+    return {attr: sizes[attr] for attr in attributes if attr in sizes}
+
+
+def _value_column(rng: np.random.Generator, n: int, attr: str, family: str) -> List[Any]:
+    if attr in PRIMARY_RANGES:
+        ranges = PRIMARY_RANGES[attr]
+        low, high = ranges.get(family, ranges[None])
+        values = _e_series(rng, n, low, high, E24 if attr == "Resistance (Ohm)" else E12)
+    elif attr in CHOICES:
+        values = rng.choice(CHOICES[attr], n)
+    elif attr in LOG_RANGES:
+        values = _log_uniform(rng, n, *LOG_RANGES[attr])
+    else:
+        values = _log_uniform(rng, n, 0.1, 100.0, 2)
+    return values.tolist()
+
+
+def generate_family(group: str, family: str, family_mapping: Dict, size: int, seed: int = 0,
+                    offset: int = 0) -> List[Dict[str, Any]]:
+    """Synthetic catalog rows of one family, shaped like the Würth components.json rows."""
+    rng = np.random.default_rng(seed)
+    core, optional = family_attributes(family_mapping)
+    attributes = core + optional
+
+    columns = _dimension_columns(rng, size, group, family, [a for a in attributes if a in DIMENSION_ATTRIBUTES])
+    for attr in attributes:
+        if attr not in columns:
+            columns[attr] = _value_column(rng, size, attr, family)
+    for attr in optional:
+        for i in np.flatnonzero(rng.random(size) < OPTIONAL_MISSING_SHARE):
+            columns[attr][i] = None
+
+    # Würth order codes, shuffled so catalog order and Order_Code order differ
+    order_codes = (880_000_000_000 + offset * 10_000_000 + rng.permutation(size)).tolist()
+    rows = []
+    for i in range(size):
+        row = {"Order_Code": str(order_codes[i]), "Product_Group": group, "Product_Family": family}
+        for attr in attributes:
+            row[attr] = columns[attr][i]
+        rows.append(row)
+    return rows
+
+
+def perturbed_sources(rows: List[Dict[str, Any]], count: int, core: List[str], optional: List[str],
+                      seed: int = 0) -> List[Dict[str, Any]]:
+    """Sources near catalog rows: jittered values, some optional attributes unknown."""
+    rng = np.random.default_rng(seed + 1)
+    sources = []
+    for i in rng.integers(0, len(rows), count):
+        row = rows[i]
+        source = {"Product_Group": row["Product_Group"], "Product_Family": row["Product_Family"]}
+        for attr in core + optional:
+            value = row.get(attr)
+            if value is None or (attr in optional and rng.random() < 0.3):
+                continue
+            if isinstance(value, float) and attr not in DIMENSION_ATTRIBUTES:
+                value = float(_round(np.array([value * rng.uniform(0.9, 1.1)]))[0])
+            source[attr] = value
+        sources.append(source)
+    return sources
+
+
+def _bom_source(row: Dict[str, str], mappings: Dict) -> Optional[Dict[str, Any]]:
+    """Würth-shaped source from one row of the sample BOM results, or None when unusable."""
+    source = translate_fields((row.get("category") or "").strip(), row, mappings)
+    if source is None:
+        return None
+    core, _ = family_attributes(mappings[source["Product_Group"]][source["Product_Family"]])
+    return source if source.get(core[0]) is not None else None
+
+
+def load_bom_sources(mappings: Dict, pattern: str = SAMPLE_BOM_GLOB) -> List[Dict[str, Any]]:
+    sources = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                source = _bom_source(row, mappings)
+                if source is not None:
+                    sources.append(source)
+    return sources
+
+
+def _engine_for(mode: str, rules: MatchingRules, index: CatalogIndex, pool) -> MatchingEngine:
+    if mode == "scalar":
+        return MatchingEngine(rules, index=index, vectorized=False)
+    if mode == "bounded":
+        return MatchingEngine(rules, index=index, bounded=True)
+    if mode == "pruned":
+        return MatchingEngine(rules, index=index, prune_window=1.0)
+    if mode == "footprint":
+        return MatchingEngine(rules, index=index, footprint_neighbours=FOOTPRINT_NEIGHBOURS)
+    if mode.startswith("parallel"):
+        return MatchingEngine(rules, index=index, pool=pool)
+    return MatchingEngine(rules, index=index)
+
+
+def _run_pass(mode: str, engine: MatchingEngine, sources: List[Component], top_k: int) -> List[float]:
+    """Latency in seconds of every call of one pass over sources."""
+    latencies = []
+    if mode.endswith("batch"):
+        start = time.perf_counter()
+        engine.match_many(sources, top_k=top_k)
+        latencies.append(time.perf_counter() - start)
+        return latencies
+    for source in sources:
+        start = time.perf_counter()
+        engine.match(source, top_k=top_k)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _peak_memory(mode: str, engine: MatchingEngine, sources: List[Component], top_k: int) -> int:
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        _run_pass(mode, engine, sources, top_k)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return max(peak - base, 0)
+
+
+def benchmark_size(size: int, modes: List[str], matching_rules: Dict, mappings: Dict, bom_sources: List[Dict[str, Any]],
+                   sources_per_family: int, repeat: int, top_k: int, max_scalar_rows: int,
+                   families: Optional[List[str]] = None, pool=None, seed: int = 0) -> Dict[str, Any]:
+    keys, codes = numeric_attributes(mappings), code_attributes(mappings)
+    rules = MatchingRules(matching_rules, mappings)
+    samples: Dict[str, Dict[str, Any]] = {mode: {"latencies": [], "sources": 0, "seconds": 0.0, "peak": 0} for mode in modes}
+    build_seconds = 0.0
+    index_bytes = 0
+
+    offset = 0
+    for group, group_families in mappings.items():
+        for family, family_mapping in group_families.items():
+            offset += 1
+            if families and family not in families:
+                continue
+
+            start = time.perf_counter()
+            rows = generate_family(group, family, family_mapping, size, seed=seed + offset, offset=offset)
+            rows = [normalize_attributes(row, keys, codes) for row in rows]
+            index = CatalogIndex(rows)
+            block = index.bucket(group, family)
+            block.order_rank
+            build_seconds += time.perf_counter() - start
+            index_bytes += block._values.nbytes + block._kinds.nbytes + block._codes.nbytes
+
+            core, optional = family_attributes(family_mapping)
+            raw_sources = [s for s in bom_sources if s["Product_Group"] == group and s["Product_Family"] == family]
+            raw_sources += perturbed_sources(rows, sources_per_family, core, optional, seed=seed + offset)
+            sources = [Component(normalize_attributes(s, keys, codes)) for s in raw_sources]
+
+            snapshot_dir = None
+            if any(mode in PARALLEL_MODES for mode in modes):
+                snapshot_dir = tempfile.TemporaryDirectory()
+                snapshot.build_snapshot(rows, snapshot_dir.name)
+            del rows
+
+            for mode in modes:
+                if mode in ("scalar", "bounded") and size > max_scalar_rows:
+                    continue
+                mode_index = SnapshotIndex(snapshot_dir.name) if mode in PARALLEL_MODES else index
+                engine = _engine_for(mode, rules, mode_index, pool)
+                stats = samples[mode]
+                # Warm-up pass fills the column and rule caches
+                _run_pass(mode, engine, sources, top_k)
+                for _ in range(repeat):
+                    latencies = _run_pass(mode, engine, sources, top_k)
+                    stats["latencies"].extend(latencies)
+                    stats["seconds"] += sum(latencies)
+                    stats["sources"] += len(sources)
+                stats["peak"] = max(stats["peak"], _peak_memory(mode, engine, sources, top_k))
+            if snapshot_dir is not None:
+                snapshot_dir.cleanup()
+
+    results: Dict[str, Any] = {"build_s": round(build_seconds, 3), "index_mb": round(index_bytes / 2**20, 2), "modes": {}}
+    for mode, stats in samples.items():
+        if not stats["latencies"]:
+            results["modes"][mode] = {"skipped": True}
+            continue
+        latencies = np.array(stats["latencies"]) * 1000.0
+        results["modes"][mode] = {
+            "calls": len(latencies),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+            "p99_ms": round(float(np.percentile(latencies, 99)), 4),
+            "sources_per_s": round(stats["sources"] / stats["seconds"], 1),
+            "peak_mb": round(stats["peak"] / 2**20, 2),
+        }
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], max_regression: float) -> List[str]:
+    """Lines describing every p50/p99 regression beyond max_regression (a fraction)."""
+    regressions = []
+    for size, entry in results["sizes"].items():
+        base_entry = baseline.get("sizes", {}).get(size)
+        if base_entry is None:
+            continue
+        for mode, stats in entry["modes"].items():
+            base = base_entry["modes"].get(mode)
+            if stats.get("skipped") or not base or base.get("skipped"):
+                continue
+            for metric in ("p50_ms", "p99_ms"):
+                change = stats[metric] / base[metric] - 1.0 if base[metric] else 0.0
+                if change > max_regression:
+                    regressions.append(f"{size} rows {mode} {metric}: {base[metric]} -> {stats[metric]} (+{change:.0%})")
+    return regressions
+
+
+def print_report(results: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None):
+    print(f"{'rows':>9} {'mode':<15} {'calls':>6} {'p50 ms':>10} {'p99 ms':>10} {'sources/s':>11} {'peak MB':>8}"
+          + ("  p50 vs baseline" if baseline else ""))
+    for size, entry in results["sizes"].items():
+        print(f"{size:>9} {'(build)':<15} {'':>6} {'':>10} {'':>10} {'':>11} {entry['index_mb']:>8}  "
+              f"{entry['build_s']} s to generate and index")
+        for mode, stats in entry["modes"].items():
+            if stats.get("skipped"):
+                print(f"{size:>9} {mode:<15} skipped")
+                continue
+            line = (f"{size:>9} {mode:<15} {stats['calls']:>6} {stats['p50_ms']:>10} {stats['p99_ms']:>10} "
+                    f"{stats['sources_per_s']:>11} {stats['peak_mb']:>8}")
+            base = (baseline or {}).get("sizes", {}).get(size, {}).get("modes", {}).get(mode)
+            if base and not base.get("skipped") and base["p50_ms"]:
+                line += f"  {stats['p50_ms'] / base['p50_ms'] - 1.0:+.0%}"
+            print(line)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Benchmark the matching engine on synthetic Würth-like catalogs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Rows per family")
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES + PARALLEL_MODES)
+    parser.add_argument("--families", nargs="+", default=None, help="Only these Product_Family names")
+    parser.add_argument("--sources", type=int, default=20, help="Perturbed catalog sources per family")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--max-scalar-rows", type=int, default=10_000,
+                        help="Skip the scalar and bounded modes above this family size")
+    parser.add_argument("--workers", type=int, default=None, help="Process pool size for the parallel modes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Exit non-zero on regressions against the baseline")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Allowed p50/p99 slowdown against the baseline, as a fraction")
+    parser.add_argument("--output", default=None, help="Also write the results as JSON to this path")
+    args = parser.parse_args(argv)
+
+    matching_rules, mappings = load_rule_configs()
+    bom_sources = load_bom_sources(mappings)
+
+    pool = None
+    if any(mode in PARALLEL_MODES for mode in args.modes):
+        from matchmaking.parallel import ShardedMatcher
+        pool = ShardedMatcher(workers=args.workers)
+
+    results = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "sources_per_family": args.sources,
+            "bom_sources": len(bom_sources),
+            "repeat": args.repeat,
+            "top_k": args.top_k,
+            "families": args.families,
+        },
+        "sizes": {},
+    }
+    try:
+        for size in args.sizes:
+            print(f"⏱️  Benchmarking {size} rows per family...", file=sys.stderr)
+            # The engine reports every match on stdout; keep it out of the timings report
+            with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+                results["sizes"][str(size)] = benchmark_size(
+                    size, args.modes, matching_rules, mappings, bom_sources, args.sources, args.repeat,
+                    args.top_k, args.max_scalar_rows, families=args.families, pool=pool, seed=args.seed
+                )
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Baseline written to {args.baseline}")
+
+    if args.compare:
+        if baseline is None:
+            print(f"❌ No baseline at {args.baseline}; run with --save-baseline first")
+            return 1
+        regressions = compare(results, baseline, args.max_regression)
+        for line in regressions:
+            print(f"❌ Regression: {line}")
+        if regressions:
+            return 1
+        print("✅ No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,21 @@
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Union, Optional, Tuple, Sequence
+from collections import OrderedDict
+import os
+import math
 import json
+import heapq
+import time
+import hashlib
+import threading
+import numpy as np
+
+from matchmaking import snapshot
+from matchmaking.spatial import FootprintTree
+from matchmaking.translation import decimal_text
 
 class Component:
+    __slots__ = ("attributes",)
+
     def __init__(self, attributes: Dict[str, Any]):
         self.attributes = attributes
 
@@ -17,81 +31,724 @@ class Component:
         print("Component attributes:", self.attributes)
 
 
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float))
+
+
+def normalize_value(value):
+    """Parse numeric strings such as "45", "19,18" or "1,000" to float; other values are returned unchanged."""
+    if isinstance(value, list):
+        return [normalize_value(v) for v in value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, int):
+        return float(value)
+    if not isinstance(value, str):
+        return value
+
+    text = decimal_text(value)
+    try:
+        number = float(text)
+    except ValueError:
+        return value
+    return number if math.isfinite(number) else value
+
+
+def is_code_attribute(attr: str) -> bool:
+    """Codes such as Size_Code ("0603", "1210") are labels: compared by equality, never as numbers."""
+    return attr.endswith("_Code")
+
+
+def normalize_code(value):
+    """Canonical text of a code: "0603" stays "0603", 1210 and 1210.0 become "1210"."""
+    if value is None or isinstance(value, bool):
+        return value
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return " ".join(str(value).split()).upper() or None
+
+
+def _mapped_attributes(mappings: Dict) -> set:
+    keys = set()
+    for families in mappings.values():
+        for family_mapping in families.values():
+            for section in ("core", "optional"):
+                for attr_key in family_mapping.get(section, {}).values():
+                    if isinstance(attr_key, list):
+                        keys.update(attr_key)
+                    elif attr_key:
+                        keys.add(attr_key)
+    return keys
+
+
+def numeric_attributes(mappings: Dict) -> frozenset:
+    """Every attribute key referenced by a core or optional rule in mappings.json, codes excepted."""
+    return frozenset(key for key in _mapped_attributes(mappings) if not is_code_attribute(key))
+
+
+def code_attributes(mappings: Dict) -> frozenset:
+    """The code attributes (see is_code_attribute) referenced by a rule in mappings.json."""
+    return frozenset(key for key in _mapped_attributes(mappings) if is_code_attribute(key))
+
+
+def normalize_attributes(attributes: Dict[str, Any], keys: frozenset, codes: frozenset = frozenset()) -> Dict[str, Any]:
+    """Copy of attributes with every mapped attribute converted once, up front: numbers to float, codes to text."""
+    return {
+        k: normalize_value(v) if k in keys else normalize_code(v) if k in codes else v
+        for k, v in attributes.items()
+    }
+
+
+def _order_key(component: Component) -> Tuple[bool, str]:
+    # Tie-break on Order_Code so equal scores rank the same way on every run
+    order_code = component.get("Order_Code")
+    return (order_code is None, "" if order_code is None else str(order_code))
+
+
+def _order_ranks(candidates: List[Component]) -> np.ndarray:
+    """Position of every candidate when sorted by Order_Code (ties by list order)."""
+    order = sorted(range(len(candidates)), key=lambda i: (_order_key(candidates[i]), i))
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order))
+    return rank
+
+
+class CatalogRecord:
+    """Array-backed catalog row: a (block, row) reference instead of a dict per part."""
+    __slots__ = ("block", "index")
+
+    def __init__(self, block: "FamilyColumns", index: int):
+        self.block = block
+        self.index = index
+
+    def get(self, key):
+        if isinstance(key, list):
+            return [self.block.value(self.index, k) for k in key]
+        return self.block.value(self.index, key)
+
+    @property
+    def attributes(self) -> Dict[str, Any]:
+        return self.block.row(self.index)
+
+    def __repr__(self):
+        return f"<Component {self.get('Order_Code')}>"
+
+    def print_attributes(self):
+        print("Component attributes:", self.attributes)
+
+
+class RecordRows:
+    """Row sequence of a family block, or of the given rows of it; records are created on access."""
+
+    def __init__(self, block: "FamilyColumns", indices: Optional[np.ndarray] = None):
+        self.block = block
+        self.indices = indices
+
+    def __len__(self):
+        return self.block.size if self.indices is None else len(self.indices)
+
+    def __getitem__(self, i):
+        if self.indices is not None:
+            i = self.indices[i]
+        return CatalogRecord(self.block, int(i))
+
+    def __iter__(self):
+        rows = range(self.block.size) if self.indices is None else self.indices.tolist()
+        return (CatalogRecord(self.block, i) for i in rows)
+
+
+class FamilyColumns:
+    """Columnar storage of the candidates of one Product_Family.
+
+    The whole family is held as an (attributes x rows) float64 matrix plus a
+    matching matrix of snapshot.KIND_* codes; strings and other non-numeric values
+    are int32 codes into the family's table of unique values (snapshot.ObjectTable).
+    Rows are exposed as CatalogRecord views. Per
+    attribute, column() returns the values with a missing-value mask (None) and a
+    numeric mask; non-numeric values are stored as 0.0 and masked out.
+    """
+
+    def __init__(self, attributes: List[str], values: np.ndarray, kinds: np.ndarray, codes: np.ndarray,
+                 objects: snapshot.ObjectTable, order_rank: Optional[np.ndarray] = None):
+        self.attributes = attributes
+        self._positions = {attr: a for a, attr in enumerate(attributes)}
+        self._values = values
+        self._kinds = kinds
+        self._codes = codes
+        self.objects = objects
+        self.size = values.shape[1]
+        self.candidates = RecordRows(self)
+        self._columns: Dict[Any, Tuple[np.ndarray, ...]] = {}
+        self._order_rank = order_rank
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]]) -> "FamilyColumns":
+        attributes, values, kinds, codes, table = snapshot.encode_rows(rows)
+        return cls(attributes, values, kinds, codes, snapshot.ObjectTable.from_texts(table))
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def order_rank(self) -> np.ndarray:
+        """Position of every candidate when sorted by Order_Code (ties by catalog order)."""
+        if self._order_rank is None:
+            self._order_rank = _order_ranks(self.candidates)
+        return self._order_rank
+
+    def value(self, i: int, attr: str):
+        a = self._positions.get(attr)
+        if a is None:
+            return None
+        return snapshot.decode_cell(self._kinds[a, i], self._values[a, i], self._codes[a, i], self.objects)
+
+    def row(self, i: int) -> Dict[str, Any]:
+        attributes = {}
+        for attr, a in self._positions.items():
+            kind = self._kinds[a, i]
+            if kind != snapshot.KIND_MISSING:
+                attributes[attr] = snapshot.decode_cell(kind, self._values[a, i], self._codes[a, i], self.objects)
+        return attributes
+
+    def code_column(self, attr: str) -> np.ndarray:
+        """Object table codes of attr, -1 where the value is not an object."""
+        a = self._positions.get(attr)
+        return np.full(self.size, -1, dtype=np.int32) if a is None else self._codes[a]
+
+    def code_index(self, attr: str) -> Dict[str, int]:
+        """{object text: code} of the values attr holds, built on first use."""
+        key = ("codes", attr)
+        cached = self._columns.get(key)
+        if cached is None:
+            cached = self.objects.index(self.code_column(attr))
+            self._columns[key] = cached
+        return cached
+
+    def column(self, attr: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        column = self._columns.get(attr)
+        if column is None:
+            a = self._positions.get(attr)
+            if a is None:
+                column = (np.zeros(self.size), np.ones(self.size, dtype=bool), np.zeros(self.size, dtype=bool))
+            else:
+                kinds = self._kinds[a]
+                column = (self._values[a], kinds == snapshot.KIND_MISSING, kinds <= snapshot.KIND_BOOL)
+            self._columns[attr] = column
+        return column
+
+    def sorted_on(self, attr: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Numeric values of attr in ascending order and the candidate indices they belong to."""
+        key = ("sorted", attr)
+        cached = self._columns.get(key)
+        if cached is None:
+            values, missing, numeric = self.column(attr)
+            indices = np.flatnonzero(numeric)
+            indices = indices[np.argsort(values[indices], kind="stable")]
+            cached = (values[indices], indices)
+            self._columns[key] = cached
+        return cached
+
+    def footprint_tree(self, attrs: Tuple[str, ...]) -> FootprintTree:
+        """k-d tree over the dimension columns attrs, built on first use and kept with the block."""
+        key = ("footprint", attrs)
+        cached = self._columns.get(key)
+        if cached is None:
+            points = np.empty((self.size, len(attrs)))
+            for a, attr in enumerate(attrs):
+                values, missing, numeric = self.column(attr)
+                points[:, a] = np.where(numeric, values, np.nan)
+            cached = FootprintTree(points)
+            self._columns[key] = cached
+        return cached
+
+    def take(self, indices: np.ndarray) -> "FamilySlice":
+        return FamilySlice(self, indices)
+
+
+class FamilySlice(FamilyColumns):
+    """A subset of a family block that shares its parent's columns and Order_Code ranks.
+
+    The parent's arrays are not copied; every accessor maps row i of the slice
+    to row indices[i] of the parent.
+    """
+
+    def __init__(self, parent: FamilyColumns, indices: np.ndarray):
+        self.parent = parent
+        self.indices = indices
+        self.size = len(indices)
+        self.candidates = RecordRows(parent, indices)
+        self._columns = {}
+
+    @property
+    def attributes(self) -> List[str]:
+        return self.parent.attributes
+
+    @property
+    def order_rank(self) -> np.ndarray:
+        return self.parent.order_rank[self.indices]
+
+    def value(self, i: int, attr: str):
+        return self.parent.value(int(self.indices[i]), attr)
+
+    def row(self, i: int) -> Dict[str, Any]:
+        return self.parent.row(int(self.indices[i]))
+
+    def take(self, indices: np.ndarray) -> "FamilySlice":
+        return FamilySlice(self.parent, self.indices[indices])
+
+    def column(self, attr: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        column = self._columns.get(attr)
+        if column is None:
+            column = tuple(array[self.indices] for array in self.parent.column(attr))
+            self._columns[attr] = column
+        return column
+
+    def code_column(self, attr: str) -> np.ndarray:
+        return self.parent.code_column(attr)[self.indices]
+
+    def code_index(self, attr: str) -> Dict[str, int]:
+        # The parent's index holds every code of the slice
+        return self.parent.code_index(attr)
+
+    @property
+    def objects(self) -> snapshot.ObjectTable:
+        return self.parent.objects
+
+
+class CatalogIndex:
+    """Catalog partitioned once at load into Product_Group -> Product_Family buckets.
+
+    Every bucket is a FamilyColumns block, so both the scalar and the vectorized
+    scoring paths start from the candidates of the source's family only.
+    """
+
+    def __init__(self, components: List[Dict[str, Any]]):
+        grouped: Dict[Any, Dict[Any, List[Dict[str, Any]]]] = {}
+        for c in components:
+            grouped.setdefault(c.get("Product_Group"), {}).setdefault(c.get("Product_Family"), []).append(c)
+        self.groups = {
+            group: {family: FamilyColumns.from_rows(members) for family, members in families.items()}
+            for group, families in grouped.items()
+        }
+
+    def bucket(self, product_group: str, product_family: str) -> Optional[FamilyColumns]:
+        return self.groups.get(product_group, {}).get(product_family)
+
+    def bucket_sizes(self) -> Dict[Any, Dict[Any, int]]:
+        return {
+            group: {family: len(block) for family, block in families.items()}
+            for group, families in self.groups.items()
+        }
+
+    def __len__(self):
+        return sum(len(block) for families in self.groups.values() for block in families.values())
+
+
+class SnapshotFamily(FamilyColumns):
+    """Family block backed by memory-mapped snapshot arrays, object table included."""
+
+    def __init__(self, snapshot_dir: str, entry: Dict[str, Any]):
+        self.snapshot_dir = snapshot_dir
+        self.entry = entry
+        values, kinds, order_rank, codes, objects = snapshot.open_family(snapshot_dir, entry)
+        super().__init__(entry["attributes"], values, kinds, codes, objects, order_rank)
+
+
+class SnapshotIndex:
+    """CatalogIndex counterpart that opens snapshot families on first use."""
+
+    def __init__(self, snapshot_dir: str):
+        self.snapshot_dir = snapshot_dir
+        self.manifest = snapshot.read_manifest(snapshot_dir)
+        self.version = self.manifest["version"]
+        self._entries = {(e["group"], e["family"]): e for e in self.manifest["families"]}
+        self._families: Dict[Tuple[Any, Any], SnapshotFamily] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, product_group: str, product_family: str) -> Optional[FamilyColumns]:
+        key = (product_group, product_family)
+        block = self._families.get(key)
+        if block is None:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            with self._lock:
+                block = self._families.get(key)
+                if block is None:
+                    block = SnapshotFamily(self.snapshot_dir, entry)
+                    self._families[key] = block
+        return block
+
+    def bucket_sizes(self) -> Dict[Any, Dict[Any, int]]:
+        sizes: Dict[Any, Dict[Any, int]] = {}
+        for entry in self.manifest["families"]:
+            sizes.setdefault(entry["group"], {})[entry["family"]] = entry["size"]
+        return sizes
+
+    def __len__(self):
+        return sum(entry["size"] for entry in self.manifest["families"])
+
+
+def _score_equal(c_val: float, r_val: float) -> float:
+    score = 1 - abs(c_val - r_val) / max(abs(r_val), 1)
+    return max(0.0, min(score, 1.0))
+
+
+def _score_at_least(c_val: float, r_val: float) -> float:
+    return 1.0 if c_val >= r_val else max(0.0, c_val / max(r_val, 1))
+
+
+def _score_at_most(c_val: float, r_val: float) -> float:
+    return 1.0 if c_val <= r_val else max(0.0, r_val / max(c_val, 1))
+
+
+def _score_unknown(c_val: float, r_val: float) -> float:
+    return 0.0
+
+
+def _score_code(c_val, r_val) -> float:
+    return 1.0 if c_val is not None and c_val == r_val else 0.0
+
+
+def _code_matches(block, attr: str, value) -> np.ndarray:
+    """Candidates of a block whose attr holds the code value, compared on the interned object codes."""
+    code = block.code_index(attr).get(snapshot.object_text(value), -1)
+    if code < 0:
+        return np.zeros(len(block), dtype=bool)
+    return np.asarray(block.code_column(attr)) == code
+
+
+OPERATORS = {
+    "=": _score_equal,
+    ">=": _score_at_least,
+    "<=": _score_at_most,
+}
+
+
+# Relative deviation an "=" attribute may have and still be shown as tolerated
+EQUAL_TOLERANCE = 0.15
+
+
+def rule_outcome(score: float, operator: str) -> str:
+    """Display outcome of an attribute score under its rule's operator.
+
+    ">=" and "<=" are hard limits: met or failed. "=" is tolerated within
+    EQUAL_TOLERANCE of the reference value.
+    """
+    if score >= 1.0:
+        return "good"
+    if operator == "=" and score > 1.0 - EQUAL_TOLERANCE:
+        return "tolerated"
+    return "failed"
+
+
 class MatchingRule:
+    """A single rule with its operator, attribute keys, weight and range branch resolved up front."""
+
     def __init__(self, rule_key: str, attribute_key: Union[str, List[str]], operator_str: str, optional: bool = False):
         self.rule_key = rule_key
         self.attribute_key = attribute_key
         self.operator_str = operator_str
         self.optional = optional
 
-    def score(self, candidate: Component, reference: Component) -> float:
-        def extract(attr):
-            return candidate.get(attr), reference.get(attr)
+        self.composite = isinstance(attribute_key, list)
+        self.attribute_keys = tuple(attribute_key) if self.composite else (attribute_key,)
+        # Code attributes (Size_Code) score 1.0 on an exact match and 0.0 otherwise
+        self.code_keys = frozenset(attr for attr in self.attribute_keys if is_code_attribute(attr))
+        self.weight = 0.5 if optional else 1.0
+        self.missing_score = 0.0 if not optional else 0.5  # boost for missing optional
+        self.compare = OPERATORS.get(operator_str, _score_unknown)
+        # Operating Temperature min/max rules pick one end of a [min, max] value
+        if "Minimum" in rule_key:
+            self.range_index = 0
+        elif "Maximum" in rule_key:
+            self.range_index = 1
+        else:
+            self.range_index = None
 
+    def score(self, candidate: Component, reference: Component) -> float:
         # Composite dimensions: average individual dimension scores
-        if isinstance(self.attribute_key, list):
-            scores = []
-            for attr in self.attribute_key:
-                c_val, r_val = extract(attr)
-                if c_val is None or r_val is None:
-                    scores.append(0.0)
-                    continue
-                if isinstance(c_val, (int, float)) and isinstance(r_val, (int, float)):
-                    score = 1 - abs(c_val - r_val) / max(abs(r_val), 1)
-                    scores.append(max(0.0, min(score, 1.0)))
-                else:
-                    scores.append(0.0)
-            return sum(scores) / len(scores)
+        if self.composite:
+            total = 0.0
+            for attr in self.attribute_keys:
+                c_val, r_val = candidate.get(attr), reference.get(attr)
+                if attr in self.code_keys:
+                    total += _score_code(c_val, r_val)
+                elif _is_number(c_val) and _is_number(r_val):
+                    total += _score_equal(c_val, r_val)
+            return total / len(self.attribute_keys)
 
         # Scalar or special cases
-        c_val, r_val = extract(self.attribute_key)
+        c_val, r_val = candidate.get(self.attribute_key), reference.get(self.attribute_key)
         if c_val is None or r_val is None:
-            return 0.0 if not self.optional else 0.5  # boost for missing optional
+            return self.missing_score
+        if self.code_keys:
+            return _score_code(c_val, r_val)
 
         # --- Special handling for Operating Temperature min/max ---
         if isinstance(c_val, list) and isinstance(r_val, list):
-            if "Minimum" in self.rule_key:
-                c_val, r_val = c_val[0], r_val[0]
-            elif "Maximum" in self.rule_key:
-                c_val, r_val = c_val[1], r_val[1]
-            else:
-                # Compare entire range (fallback)
-                c_min, c_max = c_val
-                r_min, r_max = r_val
-                if self.operator_str == ">=":
-                    return 1.0 if c_max >= r_max else max(0.0, (c_max - r_max) / max(r_max, 1))
-                elif self.operator_str == "<=":
-                    return 1.0 if c_min <= r_min else max(0.0, (r_min - c_min) / max(r_min, 1))
-                return 0.0
+            if self.range_index is None:
+                return self._score_range(c_val, r_val)
+            c_val, r_val = c_val[self.range_index], r_val[self.range_index]
 
         # Handle non-numeric after fallback unwrap
-        if not isinstance(c_val, (int, float)) or not isinstance(r_val, (int, float)):
+        if not _is_number(c_val) or not _is_number(r_val):
             return 0.0
 
-        # Numeric comparison
-        try:
-            if self.operator_str == "=":
-                score = 1 - abs(c_val - r_val) / max(abs(r_val), 1)
-                return max(0.0, min(score, 1.0))
-            elif self.operator_str == ">=":
-                return 1.0 if c_val >= r_val else max(0.0, c_val / max(r_val, 1))
-            elif self.operator_str == "<=":
-                return 1.0 if c_val <= r_val else max(0.0, r_val / max(c_val, 1))
-        except:
-            return 0.0
+        return self.compare(c_val, r_val)
 
+    def _score_range(self, c_val: List[float], r_val: List[float]) -> float:
+        # Compare entire range (fallback)
+        c_min, c_max = c_val
+        r_min, r_max = r_val
+        if self.operator_str == ">=":
+            return 1.0 if c_max >= r_max else max(0.0, (c_max - r_max) / max(r_max, 1))
+        elif self.operator_str == "<=":
+            return 1.0 if c_min <= r_min else max(0.0, (r_min - c_min) / max(r_min, 1))
         return 0.0
 
+    def score_columns(self, block: "FamilyColumns", reference: Component) -> np.ndarray:
+        """Vectorized counterpart of score() for every candidate of a family block."""
+        n = len(block)
+
+        # Composite dimensions: average individual dimension scores
+        if self.composite:
+            total = np.zeros(n)
+            for attr in self.attribute_keys:
+                r_val = reference.get(attr)
+                if attr in self.code_keys:
+                    if r_val is not None:
+                        total += _code_matches(block, attr, r_val)
+                    continue
+                if not _is_number(r_val):
+                    continue
+                values, missing, numeric = block.column(attr)
+                score = np.clip(1 - np.abs(values - r_val) / max(abs(r_val), 1), 0.0, 1.0)
+                total += np.where(numeric, score, 0.0)
+            return total / len(self.attribute_keys)
+
+        r_val = reference.get(self.attribute_key)
+        if r_val is None:
+            return np.full(n, self.missing_score)
+
+        values, missing, numeric = block.column(self.attribute_key)
+        if self.code_keys:
+            return np.where(missing, self.missing_score, _code_matches(block, self.attribute_key, r_val).astype(float))
+        if isinstance(r_val, list):
+            # Range comparisons depend on the candidate's own list value, keep the scalar semantics
+            return np.array([self.score(c, reference) for c in block.candidates], dtype=float)
+        if not _is_number(r_val) or self.compare is _score_unknown:
+            return np.where(missing, self.missing_score, 0.0)
+
+        if self.compare is _score_equal:
+            score = np.clip(1 - np.abs(values - r_val) / max(abs(r_val), 1), 0.0, 1.0)
+        elif self.compare is _score_at_least:
+            score = np.where(values >= r_val, 1.0, np.maximum(0.0, values / max(r_val, 1)))
+        else:
+            score = np.where(values <= r_val, 1.0, np.maximum(0.0, r_val / np.maximum(values, 1)))
+
+        return np.where(missing, self.missing_score, np.where(numeric, score, 0.0))
+
+    def score_matrix(self, block: "FamilyColumns", references: List[Component]) -> np.ndarray:
+        """Scores of every reference (rows) against every candidate (columns) of a block."""
+        if self.composite:
+            total = np.zeros((len(references), len(block)))
+            for attr in self.attribute_keys:
+                if attr in self.code_keys:
+                    for i, reference in enumerate(references):
+                        r_val = reference.get(attr)
+                        if r_val is not None:
+                            total[i] += _code_matches(block, attr, r_val)
+                    continue
+                rows, r_vals = _numeric_references(references, attr)
+                if not rows:
+                    continue
+                values, missing, numeric = block.column(attr)
+                r_col = np.array(r_vals, dtype=np.float64)[:, None]
+                score = np.clip(1 - np.abs(values - r_col) / np.maximum(np.abs(r_col), 1), 0.0, 1.0)
+                total[rows] += np.where(numeric, score, 0.0)
+            return total / len(self.attribute_keys)
+
+        rows, r_vals = _numeric_references(references, self.attribute_key)
+        if self.code_keys:
+            rows, r_vals = [], []
+        matrix = np.empty((len(references), len(block)))
+        numeric_rows = set(rows)
+        for i, reference in enumerate(references):
+            if i not in numeric_rows:
+                matrix[i] = self.score_columns(block, reference)
+        if not rows or self.compare is _score_unknown:
+            for i in rows:
+                matrix[i] = self.score_columns(block, references[i])
+            return matrix
+
+        values, missing, numeric = block.column(self.attribute_key)
+        r_col = np.array(r_vals, dtype=np.float64)[:, None]
+        if self.compare is _score_equal:
+            score = np.clip(1 - np.abs(values - r_col) / np.maximum(np.abs(r_col), 1), 0.0, 1.0)
+        elif self.compare is _score_at_least:
+            score = np.where(values >= r_col, 1.0, np.maximum(0.0, values / np.maximum(r_col, 1)))
+        else:
+            score = np.where(values <= r_col, 1.0, np.maximum(0.0, r_col / np.maximum(values, 1)))
+        matrix[rows] = np.where(missing, self.missing_score, np.where(numeric, score, 0.0))
+        return matrix
+
+    def explain(self, candidate: Component, reference: Component, score: float,
+                weight: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Breakdown of this rule for one scored candidate, one entry per attribute.
+
+        score is the rule score from the scoring pass; composite rules also report
+        the score of each dimension they average. weight overrides the rule weight.
+        """
+        entries = []
+        for attr in self.attribute_keys:
+            c_val, r_val = candidate.get(attr), reference.get(attr)
+            attr_score = score
+            if attr in self.code_keys and self.composite:
+                attr_score = _score_code(c_val, r_val)
+            elif self.composite:
+                attr_score = _score_equal(c_val, r_val) if _is_number(c_val) and _is_number(r_val) else 0.0
+            entries.append({
+                "rule": self.rule_key,
+                "attribute": attr,
+                "operator": self.operator_str,
+                "values": [c_val, r_val],
+                "score": float(attr_score),
+                "rule_score": float(score),
+                "weight": self.weight if weight is None else float(weight),
+                "outcome": "missing" if c_val is None or r_val is None else rule_outcome(attr_score, self.operator_str),
+            })
+        return entries
 
     def __repr__(self):
         return f"<Rule {self.rule_key} {self.operator_str} on {self.attribute_key}>"
 
+
+def _numeric_references(references: List[Component], attr: str) -> Tuple[List[int], List[float]]:
+    rows, r_vals = [], []
+    for i, reference in enumerate(references):
+        r_val = reference.get(attr)
+        if _is_number(r_val):
+            rows.append(i)
+            r_vals.append(r_val)
+    return rows, r_vals
+
+
+class RuleSet:
+    """Compiled scorer for one (Product_Group, Product_Family) pair.
+
+    Iterating a RuleSet yields its MatchingRule objects, so it can be used wherever
+    the plain rule list from get_rules_for was used before.
+    """
+
+    def __init__(self, rules: List[MatchingRule]):
+        self.rules = tuple(rules)
+        self._scorers = tuple((rule.score, rule.weight) for rule in self.rules)
+        # Primary value rule (Capacitance, Inductance, Resistance): first scalar core "=" rule
+        self.primary_rule = next(
+            (r for r in self.rules
+             if not r.optional and not r.composite and not r.code_keys and r.compare is _score_equal),
+            None
+        )
+        # Composite Dimensions rule, answered by the family's footprint index
+        self.dimension_rule = next((r for r in self.rules if not r.optional and r.composite), None)
+        # Heaviest rules first for branch-and-bound; the sort is stable so core rules keep
+        # their order and the summation order (and thus every score) stays the same
+        self.bounded_scorers = tuple(sorted(self._scorers, key=lambda scorer: -scorer[1]))
+        # remaining_weight[j]: best score still reachable from rule j onwards
+        self.remaining_weight = tuple(
+            sum(weight for _, weight in self.bounded_scorers[j:]) for j in range(len(self.bounded_scorers))
+        )
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def score(self, candidate: Component, reference: Component) -> float:
+        total_score = 0.0
+        for score, weight in self._scorers:
+            total_score += score(candidate, reference) * weight
+        return total_score
+
+    def score_rules(self, candidate: Component, reference: Component) -> Tuple[float, List[float]]:
+        """score() plus the unweighted score of every rule, in rule order."""
+        total_score = 0.0
+        rule_scores = []
+        for score, weight in self._scorers:
+            rule_score = score(candidate, reference)
+            rule_scores.append(rule_score)
+            total_score += rule_score * weight
+        return total_score, rule_scores
+
+    def score_columns(self, block: "FamilyColumns", reference: Component,
+                      rule_scores: Optional[List[np.ndarray]] = None) -> np.ndarray:
+        """Total score of every candidate; appends each rule's scores to rule_scores when given."""
+        total = np.zeros(len(block))
+        for rule in self.rules:
+            score = rule.score_columns(block, reference)
+            if rule_scores is not None:
+                rule_scores.append(score)
+            total += score * rule.weight
+        return total
+
+    def score_matrix(self, block: "FamilyColumns", references: List[Component],
+                     rule_scores: Optional[List[np.ndarray]] = None) -> np.ndarray:
+        total = np.zeros((len(references), len(block)))
+        for rule in self.rules:
+            score = rule.score_matrix(block, references)
+            if rule_scores is not None:
+                rule_scores.append(score)
+            total += score * rule.weight
+        return total
+
+    def explain(self, candidate: Component, reference: Component, rule_scores: List[float],
+                weights: Optional[Sequence[float]] = None) -> List[Dict[str, Any]]:
+        """Per-rule breakdown of one candidate from the rule scores of the scoring pass."""
+        weights = [None] * len(self.rules) if weights is None else weights
+        return [
+            entry
+            for rule, score, weight in zip(self.rules, rule_scores, weights)
+            for entry in rule.explain(candidate, reference, score, weight)
+        ]
+
+    def weight_vector(self, weights: Union[Dict[str, float], Sequence[float], None] = None) -> np.ndarray:
+        """Rule weights in rule order: defaults, overridden by {rule_key: weight} or a full vector."""
+        vector = np.array([rule.weight for rule in self.rules], dtype=np.float64)
+        if weights is None:
+            return vector
+        if isinstance(weights, dict):
+            positions = {rule.rule_key: r for r, rule in enumerate(self.rules)}
+            unknown = [key for key in weights if key not in positions]
+            if unknown:
+                raise ValueError(f"Unknown rules {unknown}; expected some of {list(positions)}.")
+            for key, weight in weights.items():
+                vector[positions[key]] = float(weight)
+            return vector
+        if len(weights) != len(self.rules):
+            raise ValueError(f"Expected {len(self.rules)} weights, one per rule, got {len(weights)}.")
+        return np.array(weights, dtype=np.float64)
+
+    def __repr__(self):
+        return f"<RuleSet {list(self.rules)}>"
+
+
 class MatchingRules:
     def __init__(self, rules_config: Dict, mapping_config: Dict):
         self.rules_config = rules_config
         self.mapping_config = mapping_config
+        self._compiled: Dict[Tuple[str, str], RuleSet] = {}
 
-    def get_rules_for(self, product_group: str, product_family: str) -> List[MatchingRule]:
+    def get_rules_for(self, product_group: str, product_family: str) -> RuleSet:
+        key = (product_group, product_family)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            compiled = RuleSet(self._build_rules(product_group, product_family))
+            self._compiled[key] = compiled
+        return compiled
+
+    def _build_rules(self, product_group: str, product_family: str) -> List[MatchingRule]:
         rules = []
         rule_def = self.rules_config.get(product_group)
         family_mapping = self.mapping_config.get(product_group, {}).get(product_family, {})
@@ -111,57 +768,646 @@ class MatchingRules:
         return rules
 
 
+# Upper bound on sources x candidates cells scored in one batch matrix (~32 MB of float64)
+MAX_MATRIX_CELLS = 4_000_000
+
+# Upper bound on rules x candidates cells kept for re-ranking across all cached queries (~128 MB)
+RERANK_CACHE_CELLS = int(os.getenv("MATCH_RERANK_CACHE_CELLS", 16_000_000))
+
+
+def _source_key(source: Component) -> str:
+    return hashlib.sha1(json.dumps(source.attributes, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class RuleScores:
+    """Unweighted per-rule scores (rules x candidates) of one source against its family block."""
+    __slots__ = ("source", "rule_set", "block", "scores")
+
+    def __init__(self, source: Component, rule_set: RuleSet, block: FamilyColumns, scores: np.ndarray):
+        self.source = source
+        self.rule_set = rule_set
+        self.block = block
+        self.scores = scores
+
+    def rank(self, weights: Union[Dict[str, float], Sequence[float], None] = None, top_k: int = 5,
+             explain: bool = False) -> List[tuple]:
+        """Weighted sum plus top-k over the kept scores; default weights rank exactly like match()."""
+        vector = self.rule_set.weight_vector(weights)
+        total = np.zeros(self.scores.shape[1])
+        for scores, weight in zip(self.scores, vector):
+            total += scores * weight
+        order = _top_k_indices(total, self.block.order_rank, top_k)
+        candidates = self.block.candidates
+        if explain:
+            return [
+                (candidates[i], float(total[i]),
+                 self.rule_set.explain(candidates[i], self.source, self.scores[:, i].tolist(), vector.tolist()))
+                for i in order
+            ]
+        return [(candidates[i], float(total[i])) for i in order]
+
+
+class RuleScoreCache:
+    """RuleScores of recent queries keyed by source content, least recently used evicted first."""
+
+    def __init__(self, max_cells: int = RERANK_CACHE_CELLS):
+        self.max_cells = max_cells
+        self._entries: "OrderedDict[str, RuleScores]" = OrderedDict()
+        self._cells = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[RuleScores]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: str, entry: RuleScores):
+        if entry.scores.size > self.max_cells:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._cells -= previous.scores.size
+            self._entries[key] = entry
+            self._cells += entry.scores.size
+            while self._cells > self.max_cells:
+                _, evicted = self._entries.popitem(last=False)
+                self._cells -= evicted.scores.size
+
+
 class MatchingEngine:
-    def __init__(self, rules: MatchingRules):
+    def __init__(self, rules: MatchingRules, index: Optional[CatalogIndex] = None, vectorized: bool = True,
+                 prune_window: Optional[float] = None, bounded: bool = False, pool=None,
+                 footprint_neighbours: Optional[int] = None):
         self.rules = rules
+        self.index = index
+        self.vectorized = vectorized
+        # Half-width of the primary value window in units of max(|value|, 1); None scores the whole family
+        self.prune_window = prune_window
+        # Nearest footprints taken from the family's k-d tree as candidates; None scores the whole family
+        self.footprint_neighbours = footprint_neighbours
+        # Branch-and-bound scalar scoring; takes precedence over the vectorized path
+        self.bounded = bounded
+        # Optional parallel.ShardedMatcher that scores large families across processes
+        self.pool = pool
+        # Per-rule scores of recent queries, re-ranked with custom weights by rerank()
+        self.score_cache = RuleScoreCache()
+        # Branch-and-bound counters summed over all queries; the engine is shared by request threads
+        self._bound_stats = {"queries": 0, "candidates": 0, "rule_evaluations": 0,
+                             "skipped_rule_evaluations": 0, "dropped_candidates": 0}
+        self._stats_lock = threading.Lock()
+
+    def bound_stats(self) -> Dict[str, int]:
+        """Branch-and-bound counters summed over every bounded query so far."""
+        with self._stats_lock:
+            return dict(self._bound_stats)
+
+    def match(self, source: Component, candidates: Optional[List[Component]] = None, top_k: int = 5,
+              explain: bool = False, keep_scores: bool = False) -> List[tuple]:
+        """Rank candidates against source.
 
-    def match(self, source: Component, candidates: List[Component], top_k: int = 5) -> List[tuple]:
+        Without explicit candidates the engine starts from the source's bucket in its
+        catalog index. In vectorized mode every rule is scored for the whole bucket in
+        one array expression; the ranking is identical to the scalar path.
+
+        With explain=True every hit is a (candidate, score, breakdown) triple, where
+        breakdown lists score, operator, both values and outcome per rule attribute,
+        taken from the rule scores of the ranking pass (see RuleSet.explain).
+        keep_scores=True keeps the per-rule scores of the vectorized pass for rerank().
+        """
         group = source.get("Product_Group")
         family = source.get("Product_Family")
-        rules = self.rules.get_rules_for(group, family)
-        
-        # Filter candidates by same Product_Family
-        candidates = [c for c in candidates if c.get("Product_Family") == source.get("Product_Family")]
+        rule_set = self.rules.get_rules_for(group, family)
+
+        if candidates is None:
+            if self.index is None:
+                raise ValueError("No catalog index loaded; pass candidates explicitly.")
+            block = self.index.bucket(group, family)
+            if block is None or not len(block) or top_k <= 0:
+                return []
+            if self.prune_window is not None or self.footprint_neighbours:
+                block = self._narrow(source, rule_set, block, top_k)
+            if self.vectorized and not self.bounded:
+                return self._match_columns(source, rule_set, block, top_k, explain, keep_scores)
+            candidates = block.candidates
+            tie_breaks = block.order_rank.tolist()
+        else:
+            # Filter candidates by same Product_Family
+            candidates = [c for c in candidates if c.get("Product_Family") == family]
+            tie_breaks = _order_ranks(candidates).tolist()
 
         print("⚙️  Applying rules:")
-        for r in rules:
+        for r in rule_set:
             print("   ", r)
 
-        results = []
-        for candidate in candidates:
+        if self.bounded:
+            matches = self._match_bounded(source, rule_set, candidates, tie_breaks, top_k)
+            # Dropped candidates keep no rule scores; the k winners are explained from their rules
+            return self._explain_winners(source, rule_set, matches) if explain else matches
+
+        # Bounded heap: keep the top_k best (highest score, then lowest Order_Code)
+        if explain:
+            scored = ((-total, tie_breaks[i], i, rule_scores)
+                      for i, (total, rule_scores) in enumerate(rule_set.score_rules(c, source) for c in candidates))
+            best = heapq.nsmallest(top_k, scored)
+            return [(candidates[i], -neg_score, rule_set.explain(candidates[i], source, rule_scores))
+                    for neg_score, _, i, rule_scores in best]
+
+        scored = ((-rule_set.score(c, source), tie_breaks[i], i) for i, c in enumerate(candidates))
+        best = heapq.nsmallest(top_k, scored)
+        return [(candidates[i], -neg_score) for neg_score, _, i in best]
+
+    def _match_bounded(self, source: Component, rule_set: RuleSet, candidates: List[Component],
+                       tie_breaks: List[int], top_k: int) -> List[tuple]:
+        """Branch-and-bound scoring: stop evaluating a candidate once it cannot enter the top_k.
+
+        The upper bound of a partially scored candidate is its score so far plus the
+        weights of the rules not evaluated yet (every rule scores at most 1.0). A
+        candidate is dropped when that bound is below the current k-th best score;
+        equal bounds are kept since they can still win on Order_Code.
+        """
+        scorers = rule_set.bounded_scorers
+        remaining_weight = rule_set.remaining_weight
+        rule_count = len(scorers)
+
+        # Min-heap of the k best so far; the root is the current k-th best
+        heap: List[Tuple[float, int, int]] = []
+        threshold = None
+        evaluated = skipped = dropped = 0
+        for i, candidate in enumerate(candidates):
             total_score = 0.0
-            for rule in rules:
-                s = rule.score(candidate, source)
-                weight = 0.5 if rule.optional else 1.0
-                total_score += s * weight
-            final_score = total_score
-            results.append((candidate, final_score))
-
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results[:top_k]
-    
-with open("matchmaking/matching_rules.json", "r") as f:
-    matching_rules = json.load(f)
+            for j, (score, weight) in enumerate(scorers):
+                if threshold is not None and total_score + remaining_weight[j] < threshold - 1e-9:
+                    skipped += rule_count - j
+                    dropped += 1
+                    break
+                total_score += score(candidate, source) * weight
+                evaluated += 1
+            else:
+                entry = (total_score, -tie_breaks[i], i)
+                if len(heap) < top_k:
+                    heapq.heappush(heap, entry)
+                elif entry > heap[0]:
+                    heapq.heapreplace(heap, entry)
+                if len(heap) == top_k:
+                    threshold = heap[0][0]
 
-with open("matchmaking/mappings.json", "r") as f:
-    mappings = json.load(f)
-    
-with open("matchmaking/components.json", "r") as f:
-    components = json.load(f)
-    components = [Component(comp) for comp in components]
-           
-rules = MatchingRules(matching_rules, mappings)
-engine = MatchingEngine(rules)
-
-def match_wuerth_components(source: Dict[str, Any], top_k: int = 5) -> List[tuple]:
-    
-    if source.get("Product_Group") not in mappings.keys():
-        raise ValueError(f"Product group {source.get('Product_Group')} not found in mappings.")
-    
-    if source.get("Product_Family") not in mappings[source.get("Product_Group")].keys():
-        raise ValueError(f"Product family {source.get('Product_Family')} not found in mappings for group {source.get('Product_Group')}.")
+        with self._stats_lock:
+            stats = self._bound_stats
+            stats["queries"] += 1
+            stats["candidates"] += len(candidates)
+            stats["rule_evaluations"] += evaluated
+            stats["skipped_rule_evaluations"] += skipped
+            stats["dropped_candidates"] += dropped
+        print(f"⏭️  Skipped {skipped} of {evaluated + skipped} rule evaluations ({dropped} candidates dropped early)")
+
+        best = sorted(heap, reverse=True)
+        return [(candidates[i], total_score) for total_score, _, i in best]
+
+    def _narrow(self, source: Component, rule_set: RuleSet, block: FamilyColumns, top_k: int) -> FamilyColumns:
+        """Narrow a family to the union of the enabled candidate generators.
+
+        The value window keeps candidates near the source's primary value, the
+        footprint index the nearest candidates by the Dimensions rule. Both are
+        approximate for the full ranking; generators that don't apply to the
+        source are skipped and the whole family is scored when none applies.
+        """
+        windows = []
+        if self.prune_window is not None:
+            windows.append(self._value_window(source, rule_set, block, top_k))
+        if self.footprint_neighbours:
+            windows.append(self._footprint_window(source, rule_set, block, max(self.footprint_neighbours, top_k)))
+        windows = [window for window in windows if window is not None]
+        if not windows:
+            return block
+
+        indices = windows[0] if len(windows) == 1 else np.union1d(*windows)
+        if len(indices) < top_k or len(indices) == len(block):
+            return block
+        return block.take(indices)
+
+    def _value_window(self, source: Component, rule_set: RuleSet, block: FamilyColumns, top_k: int) -> Optional[np.ndarray]:
+        """Indices of the candidates whose primary value lies near the source's.
+
+        The primary "=" rule scores zero once |candidate - source| reaches
+        max(|source|, 1), so with prune_window=1.0 nothing outside the window can
+        score on it. None when the window holds fewer than top_k candidates.
+        """
+        rule = rule_set.primary_rule
+        r_val = source.get(rule.attribute_key) if rule is not None else None
+        if not _is_number(r_val):
+            return None
+
+        sorted_values, indices = block.sorted_on(rule.attribute_key)
+        half_width = max(abs(r_val), 1) * self.prune_window
+        lo = np.searchsorted(sorted_values, r_val - half_width, side="left")
+        hi = np.searchsorted(sorted_values, r_val + half_width, side="right")
+        if hi - lo < top_k:
+            return None
+
+        print(f"✂️  Pruned {rule.rule_key} window to {hi - lo} of {len(block)} candidates")
+        return np.sort(indices[lo:hi])
+
+    def _footprint_window(self, source: Component, rule_set: RuleSet, block: FamilyColumns, k: int) -> Optional[np.ndarray]:
+        """Indices of the k candidates with the best Dimensions score (ties at the k-th included)."""
+        rule = rule_set.dimension_rule
+        if rule is None:
+            return None
+        center = np.array([value if _is_number(value) else np.nan for value in source.get(list(rule.attribute_keys))],
+                          dtype=np.float64)
+        if np.isnan(center).all():
+            return None
+
+        indices = block.footprint_tree(rule.attribute_keys).query(center, k)
+        print(f"📐 Footprint index picked {len(indices)} of {len(block)} candidates")
+        return indices
+
+    def nearest_footprints(self, source: Component, k: int = 10) -> List[tuple]:
+        """The k candidates of the source's family closest in footprint, with their Dimensions score."""
+        if self.index is None:
+            raise ValueError("No catalog index loaded.")
+        rule_set = self.rules.get_rules_for(source.get("Product_Group"), source.get("Product_Family"))
+        block = self.index.bucket(source.get("Product_Group"), source.get("Product_Family"))
+        if block is None or not len(block) or k <= 0:
+            return []
+        indices = self._footprint_window(source, rule_set, block, k)
+        if indices is None:
+            return []
+
+        subset = block.take(indices)
+        scores = rule_set.dimension_rule.score_columns(subset, source)
+        order = _top_k_indices(scores, subset.order_rank, k)
+        return [(subset.candidates[i], float(scores[i])) for i in order]
+
+    def build_footprint_index(self):
+        """Build the footprint tree of every family up front instead of on its first query."""
+        for group, families in self.index.bucket_sizes().items():
+            for family in families:
+                rule = self.rules.get_rules_for(group, family).dimension_rule
+                block = self.index.bucket(group, family)
+                if rule is not None and block is not None:
+                    block.footprint_tree(rule.attribute_keys)
+
+    def match_many(self, sources: List[Component], top_k: int = 5, explain: bool = False) -> List[List[tuple]]:
+        """Rank the catalog for many sources at once, results in the order of sources.
+
+        Sources are grouped by family and each group is scored as one
+        sources x candidates matrix, so a whole BOM costs one pass per family.
+        With prune_window or footprint_neighbours set, the candidates are narrowed
+        per source, so each source is ranked by match() instead; either way every
+        result is the one match() returns. explain works as in match().
+        """
+        if self.index is None:
+            raise ValueError("No catalog index loaded.")
+
+        results: List[List[tuple]] = [[] for _ in sources]
+        grouped: Dict[Tuple[Any, Any], List[int]] = {}
+        for i, source in enumerate(sources):
+            grouped.setdefault((source.get("Product_Group"), source.get("Product_Family")), []).append(i)
+
+        for (group, family), positions in grouped.items():
+            block = self.index.bucket(group, family)
+            if block is None or not len(block) or top_k <= 0:
+                continue
+            if not self.vectorized or self.prune_window is not None or self.footprint_neighbours:
+                for i in positions:
+                    results[i] = self.match(sources[i], top_k=top_k, explain=explain)
+                continue
+
+            rule_set = self.rules.get_rules_for(group, family)
+            print(f"⚙️  Applying rules (batch of {len(positions)}):")
+            for r in rule_set:
+                print("   ", r)
+
+            group_sources = [sources[i] for i in positions]
+            if self.pool is not None and self.pool.accepts(block, rule_set, group_sources):
+                print(f"🧵 Sharding {len(block)} candidates across {self.pool.workers} workers")
+                for i, (order, scores) in zip(positions, self.pool.match_block(block, rule_set, group_sources, top_k)):
+                    results[i] = [(block.candidates[j], float(score)) for j, score in zip(order, scores)]
+                    if explain:
+                        results[i] = self._explain_winners(sources[i], rule_set, results[i])
+                continue
+
+            # Bound the matrix size so huge families don't allocate sources x candidates at once
+            rows_per_pass = max(1, MAX_MATRIX_CELLS // len(block))
+            for start in range(0, len(positions), rows_per_pass):
+                chunk = positions[start:start + rows_per_pass]
+                rule_scores = [] if explain else None
+                matrix = rule_set.score_matrix(block, [sources[i] for i in chunk], rule_scores)
+                for r, (row, i) in enumerate(zip(matrix, chunk)):
+                    order = _top_k_indices(row, block.order_rank, top_k)
+                    if explain:
+                        results[i] = [
+                            (block.candidates[j], float(row[j]),
+                             rule_set.explain(block.candidates[j], sources[i], [scores[r, j] for scores in rule_scores]))
+                            for j in order
+                        ]
+                    else:
+                        results[i] = [(block.candidates[j], float(row[j])) for j in order]
+        return results
+
+    def rule_scores(self, source: Component) -> Optional[RuleScores]:
+        """Per-rule scores of source against its family, from the cache or one vectorized pass."""
+        key = _source_key(source)
+        entry = self.score_cache.get(key)
+        if entry is not None:
+            return entry
+        if self.index is None:
+            raise ValueError("No catalog index loaded.")
+
+        group = source.get("Product_Group")
+        family = source.get("Product_Family")
+        block = self.index.bucket(group, family)
+        if block is None or not len(block):
+            return None
+        rule_set = self.rules.get_rules_for(group, family)
+        if self.prune_window is not None or self.footprint_neighbours:
+            block = self._narrow(source, rule_set, block, 1)
+
+        rule_scores: List[np.ndarray] = []
+        rule_set.score_columns(block, source, rule_scores)
+        entry = RuleScores(source, rule_set, block, np.array(rule_scores).reshape(len(rule_set), len(block)))
+        self.score_cache.put(key, entry)
+        return entry
+
+    def rerank(self, source: Component, weights: Union[Dict[str, float], Sequence[float], None] = None,
+               top_k: int = 5, explain: bool = False) -> List[tuple]:
+        """Rank source's family with custom rule weights ({rule_key: weight} or one per rule).
+
+        Repeated calls for the same source only re-weight the cached per-rule
+        scores; the catalog is scored once per source while it stays cached.
+        """
+        entry = self.rule_scores(source)
+        if entry is None or top_k <= 0:
+            return []
+        return entry.rank(weights, top_k=top_k, explain=explain)
+
+    def _match_columns(self, source: Component, rule_set: RuleSet, block: FamilyColumns, top_k: int,
+                       explain: bool = False, keep_scores: bool = False) -> List[tuple]:
+        print("⚙️  Applying rules (vectorized):")
+        for r in rule_set:
+            print("   ", r)
+
+        if self.pool is not None and self.pool.accepts(block, rule_set, [source]):
+            print(f"🧵 Sharding {len(block)} candidates across {self.pool.workers} workers")
+            order, scores = self.pool.match_block(block, rule_set, [source], top_k)[0]
+            matches = [(block.candidates[i], float(score)) for i, score in zip(order, scores)]
+            return self._explain_winners(source, rule_set, matches) if explain else matches
+
+        rule_scores = [] if explain or keep_scores else None
+        total = rule_set.score_columns(block, source, rule_scores)
+        if keep_scores:
+            scores = np.array(rule_scores).reshape(len(rule_set), len(block))
+            self.score_cache.put(_source_key(source), RuleScores(source, rule_set, block, scores))
+        order = _top_k_indices(total, block.order_rank, top_k)
+        if explain:
+            return [
+                (block.candidates[i], float(total[i]),
+                 rule_set.explain(block.candidates[i], source, [scores[i] for scores in rule_scores]))
+                for i in order
+            ]
+        return [(block.candidates[i], float(total[i])) for i in order]
+
+    @staticmethod
+    def _explain_winners(source: Component, rule_set: RuleSet, matches: List[tuple]) -> List[tuple]:
+        # Used where the pass keeps no per-rule scores (worker processes, branch-and-bound)
+        return [(c, score, rule_set.explain(c, source, rule_set.score_rules(c, source)[1])) for c, score in matches]
+
+
+def _top_k_indices(scores: np.ndarray, order_rank: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the top_k scores, highest first, ties broken by order_rank.
+
+    argpartition finds the k-th best score in linear time; only candidates at or
+    above it are sorted, so there is no full O(n log n) sort per request.
+    """
+    n = len(scores)
+    if top_k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k < n:
+        kth = scores[np.argpartition(-scores, top_k - 1)[top_k - 1]]
+        pool = np.flatnonzero(scores >= kth)
+    else:
+        pool = np.arange(n)
+    order = pool[np.lexsort((order_rank[pool], -scores[pool]))]
+    return order[:top_k]
+
+
+RULES_PATH = "matchmaking/matching_rules.json"
+MAPPINGS_PATH = "matchmaking/mappings.json"
+COMPONENTS_PATH = "matchmaking/components.json"
+SNAPSHOT_DIR = os.getenv("MATCH_SNAPSHOT_DIR", "matchmaking/snapshot")
+
+def load_rule_configs() -> Tuple[Dict, Dict]:
+    with open(RULES_PATH, "r") as f:
+        matching_rules = json.load(f)
+
+    with open(MAPPINGS_PATH, "r") as f:
+        mappings = json.load(f)
+
+    return matching_rules, mappings
+
+def load_catalog_index(mappings: Dict):
+    """Open the columnar snapshot if one was built, otherwise parse components.json."""
+    if os.path.exists(os.path.join(SNAPSHOT_DIR, snapshot.MANIFEST)):
+        if snapshot.read_manifest(SNAPSHOT_DIR).get("format") == snapshot.FORMAT:
+            print(f"📦 Opening catalog snapshot {SNAPSHOT_DIR}")
+            return SnapshotIndex(SNAPSHOT_DIR)
+        print(f"⚠️  Snapshot {SNAPSHOT_DIR} has an older format; rebuild it. Reading {COMPONENTS_PATH} instead")
+
+    keys, codes = numeric_attributes(mappings), code_attributes(mappings)
+    with open(COMPONENTS_PATH, "r") as f:
+        components = json.load(f)
+        components = [normalize_attributes(comp, keys, codes) for comp in components]
+    return CatalogIndex(components)
+
+def _source_files() -> List[str]:
+    manifest_path = os.path.join(SNAPSHOT_DIR, snapshot.MANIFEST)
+    catalog_path = manifest_path if os.path.exists(manifest_path) else COMPONENTS_PATH
+    return [RULES_PATH, MAPPINGS_PATH, catalog_path]
+
+def _source_signature() -> Tuple:
+    signature = []
+    for path in _source_files():
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            signature.append((path, None, None))
+    return tuple(signature)
+
+_pool = None
+
+def _get_pool():
+    """Process pool shared by every catalog version, created when MATCH_WORKERS is set.
+
+    Only families of a snapshot catalog are sharded; see parallel.ShardedMatcher.accepts.
+    """
+    global _pool
+    workers = os.getenv("MATCH_WORKERS")
+    if _pool is None and workers:
+        from matchmaking.parallel import ShardedMatcher
+        _pool = ShardedMatcher(workers=int(workers))
+    return _pool
+
+def _make_engine(rules: MatchingRules, index) -> MatchingEngine:
+    prune_window = os.getenv("MATCH_PRUNE_WINDOW")
+    footprint_neighbours = os.getenv("MATCH_FOOTPRINT_NEIGHBOURS")
+    return MatchingEngine(
+        rules,
+        index=index,
+        prune_window=float(prune_window) if prune_window else None,
+        bounded=os.getenv("MATCH_BOUNDED", "").lower() in ("1", "true", "yes"),
+        pool=_get_pool(),
+        footprint_neighbours=int(footprint_neighbours) if footprint_neighbours else None
+    )
+
+
+class CatalogState:
+    """One consistent version of the rule configs, the catalog index and the engine on top.
+
+    Requests take the current state once and use it to the end, so a reload never
+    mixes versions inside a request and in-flight requests finish on the old one.
+    """
+
+    def __init__(self, matching_rules: Dict, mappings: Dict, index, signature: Tuple = ()):
+        self.matching_rules = matching_rules
+        self.mappings = mappings
+        self.numeric_keys = numeric_attributes(mappings)
+        self.code_keys = code_attributes(mappings)
+        self.rules = MatchingRules(matching_rules, mappings)
+        self.index = index
+        self.engine = _make_engine(self.rules, index)
+        self.signature = signature
+
+        digest = hashlib.sha256()
+        digest.update(json.dumps([matching_rules, mappings], sort_keys=True).encode("utf-8"))
+        catalog_version = getattr(index, "version", None)
+        if catalog_version is None:
+            digest.update(repr([s[1:] for s in signature if s[0] == COMPONENTS_PATH]).encode("utf-8"))
+        else:
+            digest.update(catalog_version.encode("utf-8"))
+        self.version = digest.hexdigest()[:12]
+
+    def normalize_source(self, source: Dict[str, Any]) -> Dict[str, Any]:
+        return normalize_attributes(source, self.numeric_keys, self.code_keys)
+
+    def validate_source(self, source: Dict[str, Any]):
+        if source.get("Product_Group") not in self.mappings.keys():
+            raise ValueError(f"Product group {source.get('Product_Group')} not found in mappings.")
+
+        if source.get("Product_Family") not in self.mappings[source.get("Product_Group")].keys():
+            raise ValueError(f"Product family {source.get('Product_Family')} not found in mappings for group {source.get('Product_Group')}.")
+
+
+def load_catalog_state() -> CatalogState:
+    signature = _source_signature()
+    matching_rules, mappings = load_rule_configs()
+    index = load_catalog_index(mappings)
+    if isinstance(index, SnapshotIndex):
+        # Map every family up front so the first requests on a new version don't pay for it
+        for entry in index.manifest["families"]:
+            index.bucket(entry["group"], entry["family"])
+    state = CatalogState(matching_rules, mappings, index, signature)
+    if state.engine.footprint_neighbours:
+        state.engine.build_footprint_index()
+    return state
+
+# The catalog is opened lazily on first use, so importing this module stays cheap
+_state: Optional[CatalogState] = None
+_state_lock = threading.Lock()
+_reload_lock = threading.Lock()
+
+def current_state() -> CatalogState:
+    global _state
+    state = _state
+    if state is None:
+        with _state_lock:
+            if _state is None:
+                _state = load_catalog_state()
+            state = _state
+    return state
+
+def reload_catalog(wait: bool = False) -> Optional[threading.Thread]:
+    """Build a new catalog state in the background and swap it in atomically.
+
+    Returns the worker thread, or None if a reload is already running. With
+    wait=True the call blocks until the new state is live.
+    """
+    if not _reload_lock.acquire(blocking=False):
+        return None
+
+    def build():
+        global _state
+        try:
+            state = load_catalog_state()
+            with _state_lock:
+                _state = state
+            print(f"🔄 Catalog version {state.version} is live")
+        except Exception as e:
+            print(f"❌ Catalog reload failed, keeping the current version: {e}")
+        finally:
+            _reload_lock.release()
+
+    thread = threading.Thread(target=build, name="catalog-reload", daemon=True)
+    thread.start()
+    if wait:
+        thread.join()
+    return thread
+
+def start_catalog_watcher(interval: float = 30.0) -> threading.Thread:
+    """Poll the rule configs and catalog files and reload when any of them changes."""
+    def watch():
+        while True:
+            time.sleep(interval)
+            state = _state
+            if state is not None and _source_signature() != state.signature:
+                print("👀 Catalog files changed, reloading")
+                reload_catalog()
+
+    thread = threading.Thread(target=watch, name="catalog-watcher", daemon=True)
+    thread.start()
+    return thread
+
+def normalize_source(source: Dict[str, Any], state: Optional[CatalogState] = None) -> Dict[str, Any]:
+    return (state or current_state()).normalize_source(source)
+
+def validate_source(source: Dict[str, Any], state: Optional[CatalogState] = None):
+    (state or current_state()).validate_source(source)
+
+def match_wuerth_components(source: Dict[str, Any], top_k: int = 5, state: Optional[CatalogState] = None,
+                            explain: bool = False, keep_scores: bool = False) -> List[tuple]:
+    state = state or current_state()
+    state.validate_source(source)
     
-    component = Component(source)
+    component = Component(state.normalize_source(source))
     
-    matches = engine.match(component, components, top_k=top_k)
-    return matches
\ No newline at end of file
+    matches = state.engine.match(component, top_k=top_k, explain=explain, keep_scores=keep_scores)
+    return matches
+
+def nearest_footprints(source: Dict[str, Any], k: int = 10, state: Optional[CatalogState] = None) -> List[tuple]:
+    state = state or current_state()
+    state.validate_source(source)
+    return state.engine.nearest_footprints(Component(state.normalize_source(source)), k=k)
+
+def rerank_components(source: Dict[str, Any], weights: Union[Dict[str, float], Sequence[float], None] = None,
+                      top_k: int = 5, state: Optional[CatalogState] = None, explain: bool = False) -> List[tuple]:
+    state = state or current_state()
+    state.validate_source(source)
+    return state.engine.rerank(Component(state.normalize_source(source)), weights, top_k=top_k, explain=explain)
+
+def match_many(sources: List[Dict[str, Any]], top_k: int = 5, state: Optional[CatalogState] = None,
+               explain: bool = False) -> List[List[tuple]]:
+    state = state or current_state()
+    for source in sources:
+        state.validate_source(source)
+
+    components = [Component(state.normalize_source(source)) for source in sources]
+    return state.engine.match_many(components, top_k=top_k, explain=explain)
+
+def catalog_bucket_sizes(state: Optional[CatalogState] = None) -> Dict[Any, Dict[Any, int]]:
+    return (state or current_state()).index.bucket_sizes()
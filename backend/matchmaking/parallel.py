@@ -0,0 +1,188 @@
+"""Process-pool sharded matching for very large families.
+
+A family block is cut into contiguous shards, every worker scores its shard for
+all sources and returns a local top-k, and the parent merges the local results
+with the same (score, Order_Code) ordering as the single-process path, so the
+ranking is identical.
+
+Only snapshot-backed families are sharded: a task is a path plus a row range,
+and each worker memory-maps the same .npy files, so the shard pages are shared
+through the OS page cache. In-memory families would have to be pickled into
+every task, which costs more than the workers save, so they are scored in the
+calling process.
+"""
+import os
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Tuple, Optional
+
+import numpy as np
+
+from matchmaking import snapshot
+from matchmaking.matchmaking import Component, MatchingRule, RuleSet, _top_k_indices, is_code_attribute
+
+# Below this many candidates the process round trip costs more than it saves
+MIN_SHARD_SIZE = 20_000
+
+# Per-worker caches, filled lazily inside the pool processes
+_worker_families: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray, np.ndarray, snapshot.ObjectTable, Dict[str, int]]] = {}
+_worker_rule_sets: Dict[str, RuleSet] = {}
+
+
+class ShardColumns:
+    """Column access to rows [start, stop) of a family, enough for RuleSet.score_matrix."""
+
+    def __init__(self, columns: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray]], size: int,
+                 codes: Optional[Dict[str, np.ndarray]] = None, objects: Optional[snapshot.ObjectTable] = None):
+        self._columns = columns
+        self.size = size
+        self._codes = codes or {}
+        self.objects = objects if objects is not None else snapshot.ObjectTable.from_texts([])
+
+    def __len__(self):
+        return self.size
+
+    def column(self, attr: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        column = self._columns.get(attr)
+        if column is None:
+            column = (np.zeros(self.size), np.ones(self.size, dtype=bool), np.zeros(self.size, dtype=bool))
+            self._columns[attr] = column
+        return column
+
+    def code_column(self, attr: str) -> np.ndarray:
+        codes = self._codes.get(attr)
+        return np.full(self.size, -1, dtype=np.int32) if codes is None else codes
+
+    def code_index(self, attr: str) -> Dict[str, int]:
+        key = ("codes", attr)
+        index = self._columns.get(key)
+        if index is None:
+            index = self.objects.index(self.code_column(attr))
+            self._columns[key] = index
+        return index
+
+
+def _rule_specs(rule_set: RuleSet) -> Tuple:
+    return tuple((r.rule_key, r.attribute_key, r.operator_str, r.optional) for r in rule_set)
+
+
+def _rule_attributes(rule_set: RuleSet) -> List[str]:
+    return list(dict.fromkeys(attr for rule in rule_set for attr in rule.attribute_keys))
+
+
+def _worker_rule_set(specs: Tuple) -> RuleSet:
+    key = json.dumps(specs)
+    rule_set = _worker_rule_sets.get(key)
+    if rule_set is None:
+        rule_set = RuleSet([MatchingRule(*spec) for spec in specs])
+        _worker_rule_sets[key] = rule_set
+    return rule_set
+
+
+def _snapshot_shard(snapshot_dir: str, entry: Dict[str, Any], attributes: List[str], start: int, stop: int) -> ShardColumns:
+    key = (snapshot_dir, entry["path"])
+    family = _worker_families.get(key)
+    if family is None:
+        values, kinds, _, codes, objects = snapshot.open_family(snapshot_dir, entry)
+        family = (values, kinds, codes, objects, {attr: a for a, attr in enumerate(entry["attributes"])})
+        _worker_families[key] = family
+    values, kinds, codes, objects, positions = family
+
+    columns = {}
+    shard_codes = {}
+    for attr in attributes:
+        a = positions.get(attr)
+        if a is not None:
+            shard_kinds = kinds[a, start:stop]
+            columns[attr] = (values[a, start:stop], shard_kinds == snapshot.KIND_MISSING, shard_kinds <= snapshot.KIND_BOOL)
+            if is_code_attribute(attr):
+                shard_codes[attr] = codes[a, start:stop]
+    return ShardColumns(columns, stop - start, shard_codes, objects)
+
+
+def _score_shard(task: Dict[str, Any]) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """Local top-k of one shard for every source: (global indices, scores) per source."""
+    start, stop = task["start"], task["stop"]
+    shard = _snapshot_shard(task["snapshot_dir"], task["entry"], task["attributes"], start, stop)
+
+    rule_set = _worker_rule_set(task["rules"])
+    sources = [Component(attributes) for attributes in task["sources"]]
+    order_rank = task["order_rank"]
+    matrix = rule_set.score_matrix(shard, sources)
+
+    results = []
+    for row in matrix:
+        local = _top_k_indices(row, order_rank, task["top_k"])
+        results.append((local + start, row[local]))
+    return results
+
+
+class ShardedMatcher:
+    """Scores large family blocks across a pool of worker processes."""
+
+    def __init__(self, workers: Optional[int] = None, min_shard_size: int = MIN_SHARD_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.min_shard_size = min_shard_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn keeps workers independent of the parent's threads (catalog watcher, server)
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def accepts(self, block, rule_set: RuleSet, sources: List[Component]) -> bool:
+        """Whether sharding pays off and keeps the single-process semantics."""
+        if self.workers < 2 or len(block) < self.min_shard_size:
+            return False
+        # Workers map snapshot files; an in-memory block would be pickled into every task
+        if not (hasattr(block, "entry") and hasattr(block, "snapshot_dir")):
+            return False
+        # Range values on the source are scored row by row against candidate objects
+        for rule in rule_set:
+            if not rule.composite and any(isinstance(s.get(rule.attribute_key), list) for s in sources):
+                return False
+        return True
+
+    def match_block(self, block, rule_set: RuleSet, sources: List[Component], top_k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Top-k (indices into block, scores) per source, identical to the single-process ranking."""
+        attributes = _rule_attributes(rule_set)
+        order_rank = np.asarray(block.order_rank)
+        source_attributes = [{attr: s.get(attr) for attr in attributes} for s in sources]
+        shard_size = -(-len(block) // self.workers)
+
+        tasks = []
+        for start in range(0, len(block), shard_size):
+            stop = min(start + shard_size, len(block))
+            task = {
+                "start": start,
+                "stop": stop,
+                "rules": _rule_specs(rule_set),
+                "sources": source_attributes,
+                "order_rank": order_rank[start:stop],
+                "top_k": top_k,
+                "snapshot_dir": block.snapshot_dir,
+                "entry": block.entry,
+                "attributes": attributes,
+            }
+            tasks.append(task)
+
+        shard_results = list(self.executor.map(_score_shard, tasks))
+
+        merged = []
+        for s in range(len(sources)):
+            indices = np.concatenate([shard[s][0] for shard in shard_results])
+            scores = np.concatenate([shard[s][1] for shard in shard_results])
+            best = _top_k_indices(scores, order_rank[indices], top_k)
+            merged.append((indices[best], scores[best]))
+        return merged
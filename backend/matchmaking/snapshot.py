@@ -0,0 +1,265 @@
+"""Memory-mappable columnar snapshot of the Würth catalog.
+
+Build it once from components.json:
+
+    python -m matchmaking.snapshot build --components matchmaking/components.json --out matchmaking/snapshot
+
+Layout of the snapshot directory:
+
+    manifest.json                     format, version and one entry per (Product_Group, Product_Family)
+    <version>/<n>/values.npy          float64 (attributes x rows), 0.0 where the value is not numeric
+    <version>/<n>/kinds.npy           uint8 (attributes x rows), one of the KIND_* codes below
+    <version>/<n>/codes.npy           int32 (attributes x rows), index into objects.npy for KIND_OBJECT cells, else -1
+    <version>/<n>/objects.npy         uint8 UTF-8 JSON text of the family's unique non-numeric values, concatenated
+    <version>/<n>/offsets.npy         int64 start of every value in objects.npy, plus the end
+    <version>/<n>/order_rank.npy      int64 rank of every row by Order_Code
+
+All files are opened with mmap_mode="r", so every API worker maps the same
+pages from the OS page cache instead of parsing JSON into Python objects; a
+string such as Order_Code or Product_Family is stored once per family and each
+row only holds its int32 code. Each version gets its own directory and the
+manifest is replaced atomically, so rebuilding never touches files that a
+running worker still has mapped. Older versions beyond --keep are pruned.
+"""
+import os
+import sys
+import shutil
+import json
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from typing import List, Dict, Any, Tuple
+
+import numpy as np
+
+KIND_FLOAT = 0
+KIND_INT = 1
+KIND_BOOL = 2
+KIND_OBJECT = 3
+KIND_MISSING = 4
+
+MANIFEST = "manifest.json"
+# Bumped whenever the file layout changes; snapshots of another format are not opened
+FORMAT = 2
+
+
+def _kind_of(value) -> int:
+    if value is None:
+        return KIND_MISSING
+    if isinstance(value, bool):
+        return KIND_BOOL
+    if isinstance(value, int):
+        return KIND_INT
+    if isinstance(value, float):
+        return KIND_FLOAT
+    return KIND_OBJECT
+
+
+def object_text(value) -> str:
+    """Canonical JSON text of a non-numeric value; equal values share one entry of the object table."""
+    return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+
+class ObjectTable:
+    """Unique non-numeric values of a family, decoded from their JSON text on first use.
+
+    The texts are one UTF-8 buffer plus the offsets of every entry, so a snapshot
+    table is memory-mapped like the other arrays.
+    """
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+        self._values: Dict[int, Any] = {}
+
+    @classmethod
+    def from_texts(cls, texts: List[str]) -> "ObjectTable":
+        encoded = [text.encode("utf-8") for text in texts]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(data) for data in encoded])
+        return cls(np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def text(self, code: int) -> str:
+        return self.blob[self.offsets[code]:self.offsets[code + 1]].tobytes().decode("utf-8")
+
+    def __getitem__(self, code: int):
+        code = int(code)
+        value = self._values.get(code)
+        if value is None:
+            value = self._values[code] = json.loads(self.text(code))
+        return value
+
+    def index(self, codes: np.ndarray) -> Dict[str, int]:
+        """{text: code} of the distinct codes in codes, e.g. one attribute's column; -1 is skipped.
+
+        Only the texts a column holds are decoded, never the whole table with
+        every Order_Code in it.
+        """
+        codes = np.unique(np.asarray(codes))
+        return {self.text(code): code for code in codes[codes >= 0].tolist()}
+
+
+def encode_rows(rows: List[Dict[str, Any]]) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray, List[str]]:
+    """Columnar encoding of rows: attribute names, values, kinds, object codes and the object table."""
+    attributes = list(dict.fromkeys(attr for row in rows for attr in row))
+    values = np.zeros((len(attributes), len(rows)), dtype=np.float64)
+    kinds = np.full((len(attributes), len(rows)), KIND_MISSING, dtype=np.uint8)
+    codes = np.full((len(attributes), len(rows)), -1, dtype=np.int32)
+    table: Dict[str, int] = {}
+
+    for a, attr in enumerate(attributes):
+        for i, row in enumerate(rows):
+            value = row.get(attr)
+            kind = _kind_of(value)
+            kinds[a, i] = kind
+            if kind == KIND_OBJECT:
+                codes[a, i] = table.setdefault(object_text(value), len(table))
+            elif kind != KIND_MISSING:
+                values[a, i] = value
+    return attributes, values, kinds, codes, list(table)
+
+
+def decode_cell(kind: int, value: float, code: int, objects: ObjectTable):
+    if kind == KIND_FLOAT:
+        return float(value)
+    if kind == KIND_INT:
+        return int(value)
+    if kind == KIND_BOOL:
+        return bool(value)
+    if kind == KIND_OBJECT:
+        return objects[code]
+    return None
+
+
+def build_snapshot(components: List[Dict[str, Any]], out_dir: str, version: str = None) -> Dict[str, Any]:
+    """Write the columnar snapshot of components to out_dir and return its manifest.
+
+    Components are normalized against mappings.json first, like the in-memory catalog.
+    """
+    from matchmaking.matchmaking import (
+        Component, _order_ranks, code_attributes, load_rule_configs, normalize_attributes, numeric_attributes
+    )
+
+    _, mappings = load_rule_configs()
+    keys, codes = numeric_attributes(mappings), code_attributes(mappings)
+    components = [normalize_attributes(comp, keys, codes) for comp in components]
+
+    grouped: Dict[Tuple[Any, Any], List[Dict[str, Any]]] = {}
+    for comp in components:
+        grouped.setdefault((comp.get("Product_Group"), comp.get("Product_Family")), []).append(comp)
+
+    version_dir = os.path.join(out_dir, version or "")
+    if version is None:
+        digest = hashlib.sha256(json.dumps([FORMAT, components], sort_keys=True).encode("utf-8")).hexdigest()
+        version = digest[:12]
+        version_dir = os.path.join(out_dir, version)
+    elif os.path.exists(version_dir):
+        raise ValueError(f"Snapshot version {version} already exists in {out_dir}.")
+
+    build_dir = version_dir + ".tmp"
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.makedirs(build_dir)
+
+    families = []
+    for n, ((group, family), rows) in enumerate(grouped.items()):
+        attributes, values, kinds, codes, table = encode_rows(rows)
+
+        path = os.path.join(version, str(n))
+        family_dir = os.path.join(build_dir, str(n))
+        os.makedirs(family_dir, exist_ok=True)
+        np.save(os.path.join(family_dir, "values.npy"), values)
+        np.save(os.path.join(family_dir, "kinds.npy"), kinds)
+        np.save(os.path.join(family_dir, "codes.npy"), codes)
+        objects = ObjectTable.from_texts(table)
+        np.save(os.path.join(family_dir, "objects.npy"), objects.blob)
+        np.save(os.path.join(family_dir, "offsets.npy"), objects.offsets)
+        np.save(os.path.join(family_dir, "order_rank.npy"), _order_ranks([Component(row) for row in rows]))
+
+        families.append({
+            "group": group,
+            "family": family,
+            "path": path,
+            "size": len(rows),
+            "attributes": attributes,
+        })
+
+    if os.path.exists(version_dir):
+        # Same content hash was built before and may be mapped right now; keep those files
+        shutil.rmtree(build_dir)
+    else:
+        os.replace(build_dir, version_dir)
+
+    manifest = {
+        "format": FORMAT,
+        "version": version,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "families": families,
+    }
+    # Write the manifest last so a half-written snapshot is never picked up
+    tmp_path = os.path.join(out_dir, MANIFEST + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(out_dir, MANIFEST))
+    return manifest
+
+
+def prune_versions(out_dir: str, keep: int = 2) -> List[str]:
+    """Remove all but the current and the keep - 1 most recent other version directories.
+
+    The previous version stays by default so workers that have not reloaded yet
+    can still open its families; files already mapped survive deletion anyway.
+    """
+    current = read_manifest(out_dir)["version"]
+    others = [
+        name for name in os.listdir(out_dir)
+        if name != current and not name.endswith(".tmp") and os.path.isdir(os.path.join(out_dir, name))
+    ]
+    others.sort(key=lambda name: os.path.getmtime(os.path.join(out_dir, name)), reverse=True)
+    removed = others[max(keep - 1, 0):]
+    for name in removed:
+        shutil.rmtree(os.path.join(out_dir, name), ignore_errors=True)
+    return removed
+
+
+def read_manifest(snapshot_dir: str) -> Dict[str, Any]:
+    with open(os.path.join(snapshot_dir, MANIFEST), "r") as f:
+        return json.load(f)
+
+
+def open_family(snapshot_dir: str, entry: Dict[str, Any]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, ObjectTable]:
+    """Memory-map the values, kinds, order_rank, codes and object table of one family."""
+    family_dir = os.path.join(snapshot_dir, entry["path"])
+    values = np.load(os.path.join(family_dir, "values.npy"), mmap_mode="r")
+    kinds = np.load(os.path.join(family_dir, "kinds.npy"), mmap_mode="r")
+    order_rank = np.load(os.path.join(family_dir, "order_rank.npy"), mmap_mode="r")
+    codes = np.load(os.path.join(family_dir, "codes.npy"), mmap_mode="r")
+    objects = ObjectTable(np.load(os.path.join(family_dir, "objects.npy"), mmap_mode="r"),
+                          np.load(os.path.join(family_dir, "offsets.npy"), mmap_mode="r"))
+    return values, kinds, order_rank, codes, objects
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(description="Build the memory-mappable catalog snapshot.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    build = subparsers.add_parser("build", help="Compile components.json into a columnar snapshot")
+    build.add_argument("--components", default="matchmaking/components.json")
+    build.add_argument("--out", default="matchmaking/snapshot")
+    build.add_argument("--version", default=None, help="Catalog version label (default: content hash)")
+    build.add_argument("--keep", type=int, default=2, help="Versions to keep, including the new one")
+    args = parser.parse_args(argv)
+
+    with open(args.components, "r") as f:
+        components = json.load(f)
+    manifest = build_snapshot(components, args.out, version=args.version)
+    print(f"✅ Snapshot {manifest['version']} with {len(manifest['families'])} families "
+          f"and {sum(entry['size'] for entry in manifest['families'])} rows written to {args.out}")
+    removed = prune_versions(args.out, keep=args.keep)
+    if removed:
+        print(f"🧹 Removed old snapshot versions {', '.join(removed)}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
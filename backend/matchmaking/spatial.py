@@ -0,0 +1,119 @@
+"""Footprint index: nearest candidates by the composite Dimensions rule.
+
+The Dimensions rule scores a candidate with the mean over its dimension
+attributes of max(0, 1 - |c - r| / max(|r|, 1)). For one source that is a
+decreasing function of
+
+    D(c) = sum over the source's numeric dimensions of min(1, |c - r| / max(|r|, 1))
+
+where a candidate without a numeric value for a dimension counts 1. D is a
+clipped, weighted L1 distance whose weights depend on the source, so
+FootprintTree is a k-d tree over the raw dimension columns and applies the
+weights at query time: its nearest neighbours are exactly the candidates with
+the best Dimensions score.
+"""
+import heapq
+from typing import List
+
+import numpy as np
+
+# Rows per leaf; leaves are scanned as one array expression
+LEAF_SIZE = 64
+
+
+class FootprintTree:
+    """k-d tree over the (rows x dimensions) footprint matrix of one family, NaN where unknown."""
+
+    def __init__(self, points: np.ndarray, leaf_size: int = LEAF_SIZE):
+        self.size, self.dims = points.shape
+        self.leaf_size = leaf_size
+        order = np.arange(self.size)
+        self._lo: List[np.ndarray] = []
+        self._hi: List[np.ndarray] = []
+        self._left: List[int] = []
+        self._right: List[int] = []
+        self._start: List[int] = []
+        self._end: List[int] = []
+        if self.size:
+            self._build(points, order, 0, self.size)
+
+        # Node bounds as (nodes x dimensions) arrays; +inf/-inf where a node has no value on an axis
+        self._lo = np.array(self._lo).reshape(-1, self.dims)
+        self._hi = np.array(self._hi).reshape(-1, self.dims)
+        self._order = order
+        self._points = points[order]
+
+    def __len__(self):
+        return self.size
+
+    def _build(self, points: np.ndarray, order: np.ndarray, start: int, end: int) -> int:
+        node = len(self._start)
+        chunk = points[order[start:end]]
+        lo = np.fmin.reduce(chunk, axis=0)
+        hi = np.fmax.reduce(chunk, axis=0)
+        self._lo.append(np.where(np.isnan(lo), np.inf, lo))
+        self._hi.append(np.where(np.isnan(hi), -np.inf, hi))
+        self._left.append(-1)
+        self._right.append(-1)
+        self._start.append(start)
+        self._end.append(end)
+
+        if end - start <= self.leaf_size:
+            return node
+        spread = self._hi[node] - self._lo[node]
+        axis = int(np.argmax(spread))
+        if not spread[axis] > 0:
+            # Every row has the same footprint; a single leaf holds them all
+            return node
+
+        # Median split on the widest axis; unknown values sort to the right half
+        mid = (start + end) // 2
+        part = np.argpartition(chunk[:, axis], mid - start)
+        order[start:end] = order[start:end][part]
+        self._left[node] = self._build(points, order, start, mid)
+        self._right[node] = self._build(points, order, mid, end)
+        return node
+
+    def query(self, center: np.ndarray, k: int) -> np.ndarray:
+        """Row indices of the k nearest rows to center by D, plus every row tied with the k-th.
+
+        NaN entries of center are dimensions the source does not know; they are
+        left out of the distance like the Dimensions rule leaves them out of the score.
+        """
+        axes = np.flatnonzero(~np.isnan(center))
+        if not self.size or not len(axes) or k <= 0:
+            return np.empty(0, dtype=np.int64)
+        c = center[axes]
+        weights = 1.0 / np.maximum(np.abs(c), 1.0)
+
+        # Lower bound of D for every node at once
+        gap = np.maximum(np.maximum(self._lo[:, axes] - c, c - self._hi[:, axes]), 0.0)
+        bounds = np.minimum(gap * weights, 1.0).sum(axis=1)
+
+        heap = [(bounds[0], 0)]
+        found_rows = np.empty(0, dtype=np.int64)
+        found_dist = np.empty(0)
+        threshold = np.inf
+        while heap:
+            bound, node = heapq.heappop(heap)
+            if bound > threshold + 1e-12:
+                break
+            left = self._left[node]
+            if left >= 0:
+                right = self._right[node]
+                heapq.heappush(heap, (bounds[left], left))
+                heapq.heappush(heap, (bounds[right], right))
+                continue
+
+            start, end = self._start[node], self._end[node]
+            dist = np.minimum(np.abs(self._points[start:end, axes] - c) * weights, 1.0)
+            dist = np.where(np.isnan(dist), 1.0, dist).sum(axis=1)
+            keep = dist <= threshold
+            found_rows = np.concatenate([found_rows, np.arange(start, end)[keep]])
+            found_dist = np.concatenate([found_dist, dist[keep]])
+            if len(found_dist) >= k:
+                threshold = np.partition(found_dist, k - 1)[k - 1]
+                keep = found_dist <= threshold
+                found_rows, found_dist = found_rows[keep], found_dist[keep]
+
+        return np.sort(self._order[found_rows])
@@ -0,0 +1,225 @@
+"""Deterministic translation of a parsed component into a Würth-shaped source.
+
+The component models (CapacitorModel, InductorModel, ResistorModel) carry values
+as strings such as "4.7uF", "4K7", "1/10W" or "-55°C". translate_fields() parses
+them into the catalog units of mappings.json, derives the dimensions from the
+model or the case code, and picks the Product_Family from the technology text
+with FAMILY_KEYWORDS. When no family can be resolved it returns None and the
+caller falls back to the LLM translation.
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+SI_PREFIXES = {"p": 1e-12, "n": 1e-9, "u": 1e-6, "µ": 1e-6, "μ": 1e-6, "m": 1e-3,
+               "": 1.0, "k": 1e3, "K": 1e3, "M": 1e6, "G": 1e9}
+_QUANTITY = re.compile(r"^\s*([-+]?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)(?:/(\d+))?\s*([pnuµμmkKMG]?)")
+# RKM notation: the letter is the decimal point and the multiplier (4K7, 4R7, 1M0, R47, 47R)
+_RKM = re.compile(r"^\s*(\d*)([RKkM])(\d*)\s*(?:Ω|(?i:ohms?))?\s*$")
+_RKM_MULTIPLIERS = {"R": 1.0, "K": 1e3, "M": 1e6}
+_NUMBERS = re.compile(r"[-+]?\d+(?:\.\d+)?")
+# Leading number with thousands separators: 1,000 / 4,700 / 12,345,678 (never 0,125)
+_GROUPED = re.compile(r"^([-+]?[1-9]\d{0,2})((?:,\d{3})+)(?!\d)")
+_DIAMETER_BY_LENGTH = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*[xX×]\s*(\d+(?:\.\d+)?)\s*$")
+_CERAMIC_DIELECTRIC = re.compile(r"^(C0G|NP0|NPO|[XYZ]\d[A-Z])$")
+
+# EIA (inch) chip size code -> (length, width) in mm
+CHIP_SIZES = {
+    "01005": (0.4, 0.2),
+    "0201": (0.6, 0.3),
+    "0402": (1.0, 0.5),
+    "0603": (1.6, 0.8),
+    "0805": (2.0, 1.25),
+    "1206": (3.2, 1.6),
+    "1210": (3.2, 2.5),
+    "1218": (3.2, 4.6),
+    "1812": (4.5, 3.2),
+    "2010": (5.0, 2.5),
+    "2220": (5.7, 5.0),
+    "2512": (6.3, 3.2),
+}
+
+CATEGORY_GROUPS = {"Capacitor": "Capacitors", "Inductor": "Power Magnetics", "Resistor": "Resistors"}
+
+# Product_Family per group, first keyword found in the technology text wins,
+# so the more specific families come first
+FAMILY_KEYWORDS: Dict[str, List[Tuple[Tuple[str, ...], str]]] = {
+    "Capacitors": [
+        (("hybrid",), "Aluminum Hybrid Polymer Capacitors"),
+        (("polymer",), "Aluminum Polymer Capacitors"),
+        (("electrolytic",), "Aluminum Electrolytic Capacitors"),
+        (("supercap", "ultracap", "edlc", "double layer", "double-layer"), "Supercapacitors (EDLCs)"),
+        (("ceramic", "mlcc", "multilayer", "multi-layer"), "MLCCs - Multilayer Ceramic Chip Capacitors"),
+        (("film",), "Film Capacitors"),
+    ],
+    "Power Magnetics": [
+        (("audio",), "Inductors For Digital Audio"),
+        (("coupled",), "Coupled Power Inductors"),
+        (("air core", "air-core"), "Air Core Power Inductor"),
+        (("high voltage", "high-voltage"), "High Voltage Power Inductors"),
+        (("unshielded", "non-shielded", "non shielded"), "Unshielded Power Inductors"),
+        (("shielded",), "Shielded Power Inductors"),
+    ],
+    "Resistors": [
+        (("metal plate", "metal strip", "shunt", "current sense"), "Metal Plate Resistors"),
+        (("thick film",), "Thick Film Resistors"),
+    ],
+}
+
+# Model field -> (catalog attribute, catalog unit in SI)
+FIELD_ATTRIBUTES = {
+    "capacitance": ("Capacitance (µF)", 1e-6),
+    "rated_voltage": ("Rated_Voltage (V)", 1.0),
+    "inductance": ("Inductance (µH)", 1e-6),
+    "rated_current": ("Rated_Current (A)", 1.0),
+    "dc_resistance": ("DC_Resistance (Ω)", 1.0),
+    "self_resonant_freq": ("Self_Resonant_Frequency (MHz)", 1e6),
+    "resistance": ("Resistance (Ohm)", 1.0),
+    "power_rating": ("Rated_Power (W)", 1.0),
+    "min_operating_temp": ("Operating_Temperature (°C) Minimum", 1.0),
+    "max_operating_temp": ("Operating_Temperature (°C) Maximum", 1.0),
+}
+
+
+def decimal_text(text: str) -> str:
+    """text with thousands separators removed and a decimal comma turned into a point.
+
+    A comma followed by exactly three digits groups thousands; any other single
+    comma is a decimal comma.
+
+    >>> decimal_text("1,000pF"), decimal_text("4,700 pF"), decimal_text("12,345,678")
+    ('1000pF', '4700 pF', '12345678')
+    >>> decimal_text("19,18"), decimal_text("4,7µF"), decimal_text("0,125"), decimal_text("1,000.5")
+    ('19.18', '4.7µF', '0.125', '1000.5')
+    """
+    text = text.strip()
+    match = _GROUPED.match(text)
+    if match is not None:
+        return match.group(1) + match.group(2).replace(",", "") + text[match.end():]
+    if text.count(",") == 1 and "." not in text:
+        return text.replace(",", ".")
+    return text
+
+
+def parse_quantity(text: Any) -> Optional[float]:
+    """Number with optional SI prefix: "4.7uF", "3.01kOhm", "4K7", "1/10W", "-55°C".
+
+    >>> parse_quantity("R47"), parse_quantity("R010"), parse_quantity("47R"), parse_quantity("4K7")
+    (0.47, 0.01, 47.0, 4700.0)
+    >>> parse_quantity("1.5e-6F"), parse_quantity("2.2E3 Ohm"), parse_quantity("R")
+    (1.5e-06, 2200.0, None)
+    >>> parse_quantity("1,000pF"), parse_quantity("4,700 pF"), parse_quantity("4,7 nF")
+    (1e-09, 4.7e-09, 4.7e-09)
+    >>> parse_quantity("0,52A"), parse_quantity("19,18")
+    (0.52, 19.18)
+    """
+    if isinstance(text, bool) or text is None:
+        return None
+    if isinstance(text, (int, float)):
+        return float(text)
+    text = decimal_text(str(text).replace("−", "-").replace("–", "-"))
+
+    match = _RKM.match(text)
+    if match is not None and (match.group(1) or match.group(3)):
+        whole, letter, fraction = match.groups()
+        return float(f"{float(f'{whole}.{fraction}') * _RKM_MULTIPLIERS[letter.upper()]:.12g}")
+
+    match = _QUANTITY.match(text)
+    if match is None:
+        return None
+    number, denominator, prefix = match.groups()
+    value = float(number) / (float(denominator) if denominator else 1.0)
+    return float(f"{value * SI_PREFIXES[prefix]:.12g}")
+
+
+def _keyword_family(group: str, text: Optional[str]) -> Optional[str]:
+    text = (text or "").lower()
+    for keywords, family in FAMILY_KEYWORDS.get(group, []):
+        if any(keyword in text for keyword in keywords):
+            return family
+    return None
+
+
+def resolve_family(category: str, fields: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+    """(Product_Group, Product_Family) of a component, or None when it cannot be told locally."""
+    group = CATEGORY_GROUPS.get(category)
+    if group is None:
+        return None
+
+    family = _keyword_family(group, fields.get("technology"))
+    if family is None and group == "Capacitors":
+        dielectric = (fields.get("dielectric_material") or "").strip().upper()
+        if _CERAMIC_DIELECTRIC.match(dielectric):
+            family = "MLCCs - Multilayer Ceramic Chip Capacitors"
+    elif family is None and group == "Power Magnetics":
+        family = _keyword_family(group, fields.get("shielding"))
+    elif family is None and group == "Resistors":
+        resistance = parse_quantity(fields.get("resistance"))
+        if resistance is not None and 0 < resistance < 0.1:
+            family = "Metal Plate Resistors"
+        elif (fields.get("case_code") or "").strip() in CHIP_SIZES:
+            family = "Thick Film Resistors"
+    return (group, family) if family is not None else None
+
+
+def _dimensions(fields: Dict[str, Any]) -> Dict[str, Any]:
+    values: Dict[str, Any] = {}
+    case_code = str(fields.get("case_code") or "").strip()
+    if case_code:
+        values["Size_Code"] = case_code
+
+    dimensions = fields.get("dimensions")
+    if isinstance(dimensions, str):
+        dimensions = [float(v) for v in _NUMBERS.findall(dimensions)]
+    if dimensions and len(dimensions) == 3 and all(v is not None for v in dimensions):
+        # Models and BOM results list dimensions as [length, width, height]
+        values["Length (mm)"], values["Width (mm)"], values["Height (mm)"] = (float(v) for v in dimensions)
+    elif case_code in CHIP_SIZES:
+        values["Length (mm)"], values["Width (mm)"] = CHIP_SIZES[case_code]
+    else:
+        match = _DIAMETER_BY_LENGTH.match(case_code)
+        if match is not None:
+            # Radial cans are given as diameter x length
+            values["Diameter (mm)"], values["Length (mm)"] = float(match.group(1)), float(match.group(2))
+    return values
+
+
+def family_attribute_names(family_mapping: Dict) -> List[str]:
+    names = []
+    for section in ("core", "optional"):
+        for attr in (family_mapping.get(section) or {}).values():
+            for name in (attr if isinstance(attr, list) else [attr]):
+                if name and name not in names:
+                    names.append(name)
+    return names
+
+
+def translate_fields(category: str, fields: Dict[str, Any], mappings: Dict) -> Optional[Dict[str, Any]]:
+    """Würth-shaped source of one component, or None when its Product_Family is not resolved.
+
+    category is the model category ("Capacitor", "Inductor", "Resistor") and fields
+    its attributes, e.g. model.model_dump() or a row of the BOM results.
+    """
+    resolved = resolve_family(category, fields)
+    if resolved is None:
+        return None
+    group, family = resolved
+    family_mapping = mappings.get(group, {}).get(family)
+    if family_mapping is None:
+        return None
+
+    values: Dict[str, Any] = {}
+    for field, (attr, unit) in FIELD_ATTRIBUTES.items():
+        value = parse_quantity(fields.get(field))
+        if value is not None:
+            values[attr] = float(f"{value / unit:.12g}")
+    values.update(_dimensions(fields))
+
+    source = {"Product_Group": group, "Product_Family": family}
+    attributes = family_attribute_names(family_mapping)
+    source.update({attr: values[attr] for attr in attributes if attr in values})
+    return source
+
+
+def translate_model(model, mappings: Dict) -> Optional[Dict[str, Any]]:
+    """translate_fields() for a CapacitorModel, InductorModel or ResistorModel."""
+    return translate_fields(getattr(model, "category", None), model.model_dump(), mappings)
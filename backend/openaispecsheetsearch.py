@@ -7,13 +7,90 @@ load_dotenv(dotenv_path=env_path, override=True)
 
 
 from component_models import CapacitorModel, InductorModel, ResistorModel, ComponentBaseModel
+from llm_cache import CachedLLMCall, PersistentCache
+from llm_clients import sync_client, async_client, llm_slot
+from partnumber_decoders import decode_partnumber
 
-def get_component_model_from_partnumber(partnumber: str):
+MODELS = {Model.__name__: Model for Model in (CapacitorModel, InductorModel, ResistorModel)}
+
+# Identified parts are kept for PARTNUMBER_CACHE_TTL seconds (default 30 days)
+partnumber_cache = PersistentCache(
+    "partnumbers",
+    ttl=float(os.getenv("PARTNUMBER_CACHE_TTL", 30 * 24 * 3600)),
+    lru_size=int(os.getenv("PARTNUMBER_CACHE_SIZE", 2048))
+)
+
+
+def normalize_partnumber(partnumber: str) -> str:
+    """Cache key of a part number: upper case without whitespace."""
+    return "".join(partnumber.split()).upper()
+
+
+def _cached_model(key: str):
+    cached = partnumber_cache.get(key)
+    if cached is not None:
+        try:
+            return MODELS[cached["model"]](**cached["data"])
+        except Exception:
+            # Stored under an older model schema; identify the part again
+            pass
+    return None
+
+
+def _store_model(key: str, model, partnumber: str):
+    partnumber_cache.set(key, {"model": type(model).__name__, "data": model.model_dump()})
+    return _with_decoded(partnumber, model)
+
+
+def _known_model(partnumber: str, refresh: bool):
+    """Decoded or cached model of a part number; (None, key) when it has to be searched."""
+    decoded = decode_partnumber(partnumber)
+    if decoded is not None and decoded.complete:
+        return decoded.model, None
+    key = normalize_partnumber(partnumber)
+    model = None if refresh else _cached_model(key)
+    return (_with_decoded(partnumber, model) if model is not None else None), key
+
+
+def _with_decoded(partnumber: str, model):
+    # Fields decoded from the ordering code win over the searched ones
+    decoded = decode_partnumber(partnumber)
+    return decoded.merge(model) if decoded is not None else model
+
+
+_identification = CachedLLMCall(_known_model, _store_model)
+
+
+def get_component_model_from_partnumber(partnumber: str, refresh: bool = False):
+    """
+    Given a part number, return a populated component model.
+    Series with a known ordering code are decoded locally (see partnumber_decoders);
+    other part numbers come from the identification cache, and refresh=True always searches again.
+    """
+    return _identification.run(search_component_model, partnumber, refresh=refresh)
+
+
+async def get_component_model_from_partnumber_async(partnumber: str, refresh: bool = False):
+    """Awaitable get_component_model_from_partnumber for the async API endpoints."""
+    return await _identification.run_async(search_component_model_async, partnumber, refresh=refresh)
+
+
+def search_component_model(partnumber: str):
     """
     Given a part number, use OpenAI to find the latest datasheet and return a populated component model.
     """
-    client = OpenAI()
-    response = client.chat.completions.create(
+    response = sync_client().chat.completions.create(**_search_request(partnumber))
+    return _parse_component_model(response.choices[0].message.content)
+
+
+async def search_component_model_async(partnumber: str):
+    async with llm_slot():
+        response = await async_client().chat.completions.create(**_search_request(partnumber))
+    return _parse_component_model(response.choices[0].message.content)
+
+
+def _search_request(partnumber: str):
+    return dict(
         model="gpt-4o-mini-search-preview-2025-03-11",
         messages=[
             {"role": "system", "content": (
@@ -82,8 +159,10 @@ def get_component_model_from_partnumber(partnumber: str):
             {"role": "user", "content": partnumber}
         ]
     )
+
+
+def _parse_component_model(content: str):
     import json
-    content = response.choices[0].message.content
     try:
         data = json.loads(content)
     except Exception:
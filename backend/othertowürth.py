@@ -1,28 +1,29 @@
 import os
+import json
+import hashlib
 from dotenv import load_dotenv
 from typing import List, Dict, Any
 
-from openai import OpenAI
 from urllib3 import response
 
 # Import your component models
 from component_models import ComponentBaseModel
+from llm_cache import CachedLLMCall, PersistentCache
+from llm_clients import sync_client, async_client, llm_slot
+from matchmaking.translation import translate_model
 
 # --- Environment Variable Loading ---
 env_path = os.path.join(os.path.dirname(__file__), 'env')
 load_dotenv(dotenv_path=env_path, override=True)
 
 
-# --- Dummy Function Placeholder ---
-def process_parsed_component(component_model: ComponentBaseModel):
-    client = OpenAI()
-    model = "gpt-4o"
-    component = f"Component:{component_model.model_dump_json()})"
-    # Reusing the prompt structure from main_processor_input.py
-    messages =  [
-            {
-                "role": "system",
-                "content": """
+# Translations are cached by component content and prompt fingerprint
+translation_cache = PersistentCache("translations", lru_size=int(os.getenv("TRANSLATION_CACHE_SIZE", 2048)))
+
+MODEL = "gpt-4o"
+MAPPINGS_PATH = os.path.join(os.path.dirname(__file__), "matchmaking", "mappings.json")
+
+SYSTEM_PROMPT = """
                 You are an expert in electronic components and data extraction. 
                 Your task is to analyze the provided datasheet of the given component and assign it to a json model from a diffrent manufacturer. 
                 Dont output anything else than the json model.
@@ -269,16 +270,126 @@ def process_parsed_component(component_model: ComponentBaseModel):
                         "Diameter (mm)": 13,
                         "Size_Code": "13.0 x 25.0"
                     }
-"""},
+"""
+
+_fingerprint = (None, None)
+
+
+def prompt_fingerprint() -> str:
+    """Hash of the model, the system prompt and mappings.json; any change invalidates the cache."""
+    global _fingerprint
+    try:
+        stat = os.stat(MAPPINGS_PATH)
+        signature = (stat.st_mtime_ns, stat.st_size)
+    except FileNotFoundError:
+        signature = None
+    if _fingerprint[0] != signature or _fingerprint[1] is None:
+        digest = hashlib.sha256()
+        digest.update(MODEL.encode("utf-8"))
+        digest.update(SYSTEM_PROMPT.encode("utf-8"))
+        if signature is not None:
+            with open(MAPPINGS_PATH, "rb") as f:
+                digest.update(f.read())
+        _fingerprint = (signature, digest.hexdigest())
+    return _fingerprint[1]
+
+
+_mappings = (None, None)
+
+
+def load_mappings() -> Dict:
+    """mappings.json, read again whenever the file changes."""
+    global _mappings
+    stat = os.stat(MAPPINGS_PATH)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    if _mappings[0] != signature:
+        with open(MAPPINGS_PATH, "r") as f:
+            _mappings = (signature, json.load(f))
+    return _mappings[1]
+
+
+def translation_key(component_model: ComponentBaseModel) -> str:
+    """Content address of a component: its canonical JSON plus the prompt fingerprint.
+
+    The BOM designator in name does not change the translation and is left out.
+    """
+    content = component_model.model_dump(mode="json", exclude={"name"})
+    canonical = json.dumps([type(component_model).__name__, content], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{prompt_fingerprint()}:{canonical}".encode("utf-8")).hexdigest()
+
+
+def _cached_translation(key: str):
+    cached = translation_cache.get(key)
+    # Callers may edit the result; keep the cached entry intact
+    return dict(cached) if cached is not None else None
+
+
+def _known_translation(component_model: ComponentBaseModel, refresh: bool):
+    """Local or cached translation of a component; (None, key) when the LLM has to translate it."""
+    result = translate_model(component_model, load_mappings())
+    if result is not None:
+        return result, None
+    key = translation_key(component_model)
+    return (None if refresh else _cached_translation(key)), key
+
+
+def _store_translation(key: str, result: Dict, component_model: ComponentBaseModel):
+    """Cache an LLM translation, unless its group or family is unknown to mappings.json."""
+    group, family = (result.get("Product_Group"), result.get("Product_Family")) if isinstance(result, dict) else (None, None)
+    if isinstance(group, str) and isinstance(family, str) and family in load_mappings().get(group, {}):
+        translation_cache.set(key, result)
+    else:
+        # Left uncached so the next request asks again instead of failing on a pinned answer
+        print(f"⚠️  Not caching translation to unknown family {group} / {family}")
+    return result
+
+
+_translation = CachedLLMCall(_known_translation, _store_translation)
+
+
+def process_parsed_component(component_model: ComponentBaseModel, refresh: bool = False):
+    """Würth-shaped source of a component.
+
+    Components whose Product_Family can be resolved locally are translated by
+    matchmaking.translation; only the rest go through the (cached) LLM translation.
+    refresh=True skips the cache and translates again.
+    """
+    return _translation.run(translate_component, component_model, refresh=refresh)
+
+
+async def process_parsed_component_async(component_model: ComponentBaseModel, refresh: bool = False):
+    """Awaitable process_parsed_component for the async API endpoints."""
+    return await _translation.run_async(translate_component_async, component_model, refresh=refresh)
+
+
+def translate_component(component_model: ComponentBaseModel):
+    response = sync_client().chat.completions.create(**_translation_request(component_model))
+    return _parse_translation(response.choices[0].message.content)
+
+
+async def translate_component_async(component_model: ComponentBaseModel):
+    async with llm_slot():
+        response = await async_client().chat.completions.create(**_translation_request(component_model))
+    return _parse_translation(response.choices[0].message.content)
+
+
+def _translation_request(component_model: ComponentBaseModel):
+    component = f"Component:{component_model.model_dump_json()})"
+    # Reusing the prompt structure from main_processor_input.py
+    messages =  [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT},
             {"role": "user", "content": f"Please process the following component: {component}"}
         ]
-    response = client.chat.completions.create(
-        model=model,
+    return dict(
+        model=MODEL,
         messages=messages,
         temperature=0,
     )
-    import json 
-    content = response.choices[0].message.content
+
+
+def _parse_translation(content: str):
     try:
         return json.loads(content)
     except Exception:
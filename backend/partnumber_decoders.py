@@ -0,0 +1,303 @@
+"""Local decoders for manufacturer part numbers that follow a documented ordering code.
+
+Every decoder is a regular expression over the normalized part number (upper
+case, no whitespace) plus a function that turns the match into component model
+fields. decode_partnumber() tries them in registration order and returns the
+first hit; a decoder returns None when a code in the part number is not in its
+tables, which lets the next decoder (and finally the LLM search) have a go.
+
+Some ordering codes do not carry every required field; Coilcraft SER numbers
+have no current rating, for example. Such a DecodedPart is incomplete: the
+datasheet search still runs and the decoded fields overwrite what it returned.
+
+New series are added with register_decoder(name, pattern, func) or the
+@decoder(name, pattern) decorator.
+"""
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Type
+
+from pydantic import BaseModel, ValidationError
+
+from component_models import CapacitorModel, InductorModel, ResistorModel
+from matchmaking.translation import CHIP_SIZES
+
+
+class PartNumberDecoder(NamedTuple):
+    name: str
+    pattern: "re.Pattern"
+    decode: Callable[["re.Match"], Optional["DecodedPart"]]
+
+
+DECODERS: List[PartNumberDecoder] = []
+
+
+def register_decoder(name: str, pattern: str, func: Callable[["re.Match"], Optional["DecodedPart"]]):
+    DECODERS.append(PartNumberDecoder(name, re.compile(pattern), func))
+    return func
+
+
+def decoder(name: str, pattern: str):
+    def register(func):
+        return register_decoder(name, pattern, func)
+    return register
+
+
+class DecodedPart:
+    def __init__(self, model_class: Type[BaseModel], fields: Dict[str, Any], decoder: str = None):
+        self.model_class = model_class
+        self.fields = {key: value for key, value in fields.items() if value is not None}
+        self.decoder = decoder
+        self.model = None
+
+    def validate(self) -> Optional[BaseModel]:
+        try:
+            self.model = self.model_class(**self.fields)
+        except ValidationError:
+            self.model = None
+        return self.model
+
+    @property
+    def complete(self) -> bool:
+        """True when the part number alone fills every required field of the model."""
+        return self.model is not None
+
+    def merge(self, model: BaseModel) -> BaseModel:
+        """model (e.g. from the datasheet search) with the decoded fields taking precedence."""
+        data = {key: value for key, value in model.model_dump().items() if key in self.model_class.model_fields}
+        data.update(self.fields)
+        return self.model_class(**data)
+
+
+def decode_partnumber(partnumber: str) -> Optional[DecodedPart]:
+    """The first decoder result for partnumber, or None when no known series matches."""
+    key = "".join(partnumber.split()).upper()
+    for entry in DECODERS:
+        match = entry.pattern.match(key)
+        if match is None:
+            continue
+        decoded = entry.decode(match)
+        if decoded is not None:
+            decoded.decoder = entry.name
+            decoded.fields.setdefault("partnumber", partnumber.strip())
+            decoded.fields.setdefault("name", partnumber.strip())
+            decoded.validate()
+            return decoded
+    return None
+
+
+# Metric size code -> EIA size code
+METRIC_SIZES = {
+    "0402": "01005",
+    "0603": "0201",
+    "1005": "0402",
+    "1608": "0603",
+    "2012": "0805",
+    "3216": "1206",
+    "3225": "1210",
+    "4532": "1812",
+    "5750": "2220",
+}
+
+# JIS rated voltage codes used by Murata and TDK
+VOLTAGE_CODES = {
+    "0E": 2.5, "0G": 4, "0J": 6.3, "1A": 10, "1C": 16, "1E": 25, "1V": 35, "1H": 50,
+    "1J": 63, "1K": 80, "2A": 100, "2D": 200, "2E": 250, "2W": 450, "2J": 630, "3A": 1000,
+}
+
+# Capacitor tolerance letters; B, C and D are absolute and apply below 10 pF
+CAPACITANCE_TOLERANCES = {
+    "W": "±0.05pF", "B": "±0.1pF", "C": "±0.25pF", "D": "±0.5pF",
+    "F": "±1%", "G": "±2%", "J": "±5%", "K": "±10%", "M": "±20%", "Z": "+80/-20%",
+}
+
+# EIA class II temperature characteristic: first letter -> minimum, digit -> maximum in °C
+_DIELECTRIC_MIN = {"X": -55, "Y": -30, "Z": 10}
+_DIELECTRIC_MAX = {"4": 65, "5": 85, "6": 105, "7": 125, "8": 150, "9": 200}
+_CLASS_I_DIELECTRICS = {"C0G", "NP0", "NPO"}
+
+
+def format_value(value: float, unit: str, prefixes=("p", "n", "u", "m", "", "k", "M", "G"), base: int = 4) -> str:
+    """value in engineering notation, e.g. format_value(4.7e-6, "F") == "4.7uF".
+
+    base is the index of the unprefixed unit in prefixes.
+    """
+    if value == 0:
+        return f"0{unit}"
+    exponent = 0
+    while abs(value) >= 1000 and base + exponent < len(prefixes) - 1:
+        value /= 1000
+        exponent += 1
+    while abs(value) < 1 and base + exponent > 0:
+        value *= 1000
+        exponent -= 1
+    return f"{round(value, 6):g}{prefixes[base + exponent]}{unit}"
+
+
+def eia_value(code: str) -> Optional[float]:
+    """Three-character EIA value code: two digits and a power of ten (475 = 4.7e6), or R as decimal point."""
+    if "R" in code:
+        try:
+            return float(code.replace("R", "."))
+        except ValueError:
+            return None
+    if not code.isdigit():
+        return None
+    return int(code[:2]) * 10 ** int(code[2])
+
+
+def dielectric_temperatures(dielectric: str):
+    """(min, max) operating temperature strings for an EIA dielectric code, or (None, None)."""
+    if dielectric in _CLASS_I_DIELECTRICS:
+        return "-55°C", "125°C"
+    if len(dielectric) == 3 and dielectric[0] in _DIELECTRIC_MIN and dielectric[1] in _DIELECTRIC_MAX:
+        return f"{_DIELECTRIC_MIN[dielectric[0]]}°C", f"{_DIELECTRIC_MAX[dielectric[1]]}°C"
+    return None, None
+
+
+def _chip_dimensions(size: str, height: Optional[float]):
+    # Same order as the datasheet search and the BOM results: [length, width, height]
+    if size not in CHIP_SIZES or height is None:
+        return None
+    length, width = CHIP_SIZES[size]
+    return [length, width, height]
+
+
+def _mlcc(manufacturer: str, size: str, dielectric: str, voltage: float, capacitance_pf: float,
+          tolerance: Optional[str], height: Optional[float] = None) -> DecodedPart:
+    min_temp, max_temp = dielectric_temperatures(dielectric)
+    return DecodedPart(CapacitorModel, {
+        "manufacturer": manufacturer,
+        "capacitance": format_value(capacitance_pf * 1e-12, "F"),
+        "rated_voltage": f"{voltage:g}V",
+        "case_code": size,
+        "dimensions": _chip_dimensions(size, height),
+        "tolerance": tolerance,
+        "dielectric_material": dielectric,
+        "min_operating_temp": min_temp,
+        "max_operating_temp": max_temp,
+        "technology": "Capacitors Ceramic Capacitors MLCC SMD",
+    })
+
+
+# Murata GRM/GCM/GRT: GRM 18 8 R6 1E 475 K E13D
+_MURATA_SIZES = {
+    "02": "01005", "03": "0201", "15": "0402", "18": "0603", "21": "0805",
+    "31": "1206", "32": "1210", "43": "1812", "55": "2220",
+}
+_MURATA_THICKNESS = {
+    "2": 0.2, "3": 0.3, "5": 0.5, "6": 0.6, "7": 0.7, "8": 0.8, "9": 0.85, "A": 1.0, "M": 1.15,
+    "B": 1.25, "N": 1.35, "Q": 1.5, "C": 1.6, "R": 1.8, "D": 2.0, "E": 2.5,
+}
+_MURATA_DIELECTRICS = {
+    "5C": "C0G", "R6": "X5R", "R7": "X7R", "C7": "X7S", "D7": "X7T", "C8": "X6S", "F5": "Y5V",
+}
+
+
+@decoder("Murata GRM", r"^(?:GRM|GCM|GRT)(\d{2})([0-9A-Z])([0-9A-Z]{2})(\d[A-Z])([0-9R]{3})([A-Z])[0-9A-Z]*$")
+def _decode_murata(match):
+    size, thickness, dielectric, voltage, value, tolerance = match.groups()
+    capacitance = eia_value(value)
+    if size not in _MURATA_SIZES or dielectric not in _MURATA_DIELECTRICS or voltage not in VOLTAGE_CODES or capacitance is None:
+        return None
+    return _mlcc(
+        "Murata", _MURATA_SIZES[size], _MURATA_DIELECTRICS[dielectric], VOLTAGE_CODES[voltage],
+        capacitance, CAPACITANCE_TOLERANCES.get(tolerance), _MURATA_THICKNESS.get(thickness)
+    )
+
+
+# TDK commercial MLCC: C 1608 X8R 1H 101 K [080 AA]
+@decoder("TDK C", r"^C(\d{4})([A-Z]\d[A-Z]|JB|CH)(\d[A-Z])([0-9R]{3})([A-Z])(\d{3})?[A-Z0-9]*$")
+def _decode_tdk(match):
+    size, dielectric, voltage, value, tolerance, thickness = match.groups()
+    capacitance = eia_value(value)
+    if size not in METRIC_SIZES or voltage not in VOLTAGE_CODES or capacitance is None:
+        return None
+    return _mlcc(
+        "TDK", METRIC_SIZES[size], dielectric, VOLTAGE_CODES[voltage], capacitance,
+        CAPACITANCE_TOLERANCES.get(tolerance), int(thickness) / 100 if thickness else None
+    )
+
+
+# Yageo CC: CC 0603 K R X7R 9 BB 104
+_YAGEO_VOLTAGES = {"5": 6.3, "6": 10, "7": 16, "8": 25, "9": 50, "0": 100, "A": 200}
+
+
+@decoder("Yageo CC", r"^CC(\d{4})([A-Z])[A-Z](NPO|X5R|X7R|X7S|X6S|X8R|Y5V)([0-9A])[A-Z]{2}([0-9R]{3})$")
+def _decode_yageo(match):
+    size, tolerance, dielectric, voltage, value = match.groups()
+    capacitance = eia_value(value)
+    if size not in CHIP_SIZES or voltage not in _YAGEO_VOLTAGES or capacitance is None:
+        return None
+    return _mlcc(
+        "Yageo", size, dielectric, _YAGEO_VOLTAGES[voltage], capacitance,
+        CAPACITANCE_TOLERANCES.get(tolerance)
+    )
+
+
+# Vishay CRCW thick film chip resistors: CRCW 0603 100R F K EA
+_VISHAY_POWER = {
+    "0201": "0.05W", "0402": "0.063W", "0603": "0.1W", "0805": "0.125W", "1206": "0.25W",
+    "1210": "0.5W", "1218": "1W", "2010": "0.75W", "2512": "1W",
+}
+_VISHAY_HEIGHT = {
+    "0201": 0.23, "0402": 0.35, "0603": 0.45, "0805": 0.45, "1206": 0.55,
+    "1210": 0.55, "1218": 0.55, "2010": 0.6, "2512": 0.6,
+}
+_RESISTANCE_TOLERANCES = {"B": "±0.1%", "D": "±0.5%", "F": "±1%", "G": "±2%", "J": "±5%"}
+_VISHAY_TCR = {"K": "100ppm/°C", "N": "200ppm/°C"}
+_RESISTANCE_MULTIPLIERS = {"R": 1, "K": 1e3, "M": 1e6}
+
+
+def resistance_value(code: str) -> Optional[float]:
+    """Resistance from an RKM code (4K70 = 4.7 kΩ, 100R = 100 Ω); all zeros is a jumper."""
+    if code.strip("0") == "":
+        return 0.0
+    letters = [c for c in code if c in _RESISTANCE_MULTIPLIERS]
+    if len(letters) != 1:
+        return None
+    letter = letters[0]
+    try:
+        return float(code.replace(letter, ".")) * _RESISTANCE_MULTIPLIERS[letter]
+    except ValueError:
+        return None
+
+
+@decoder("Vishay CRCW", r"^CRCW(\d{4})([0-9RKM]{4})([A-Z])([A-Z0-9])[A-Z0-9]{2}$")
+def _decode_vishay(match):
+    size, value, tolerance, tcr = match.groups()
+    resistance = resistance_value(value)
+    if size not in _VISHAY_POWER or resistance is None:
+        return None
+    return DecodedPart(ResistorModel, {
+        "manufacturer": "Vishay",
+        "resistance": format_value(resistance, "Ω", prefixes=("", "k", "M", "G"), base=0),
+        "power_rating": _VISHAY_POWER[size],
+        "case_code": size,
+        "dimensions": _chip_dimensions(size, _VISHAY_HEIGHT[size]),
+        "tolerance": _RESISTANCE_TOLERANCES.get(tolerance),
+        "temp_coefficient": _VISHAY_TCR.get(tcr),
+        "min_operating_temp": "-55°C",
+        "max_operating_temp": "155°C",
+        "technology": "Resistors Thick Film Chip Resistor SMD" if resistance else "Resistors Jumper SMD",
+    })
+
+
+# Coilcraft SER shielded power inductors: SER2010-202MLD. The code carries no
+# current rating, so these decode incomplete and the datasheet search fills the rest.
+_INDUCTANCE_TOLERANCES = {"J": "±5%", "K": "±10%", "M": "±20%"}
+
+
+@decoder("Coilcraft SER", r"^SER(\d{4})-?(\d{3})([A-Z])[A-Z]{0,3}$")
+def _decode_coilcraft_ser(match):
+    series, value, tolerance = match.groups()
+    inductance = eia_value(value)
+    if inductance is None:
+        return None
+    return DecodedPart(InductorModel, {
+        "manufacturer": "Coilcraft",
+        "inductance": format_value(inductance * 1e-9, "H"),
+        "case_code": f"SER{series}",
+        "shielding": "Shielded",
+        "tolerance": _INDUCTANCE_TOLERANCES.get(tolerance),
+        "technology": "Inductors Shielded Power Inductor SMD",
+    })
@@ -0,0 +1,48 @@
+import pytest
+
+from partnumber_decoders import decode_partnumber
+
+DECODED = [
+    ("GRM188R61E475KE13D", "Murata GRM", True,
+     {"capacitance": "4.7uF", "rated_voltage": "25V", "case_code": "0603", "tolerance": "±10%",
+      "dielectric_material": "X5R"}),
+    ("C1608X8R1H101K", "TDK C", True,
+     {"capacitance": "100pF", "rated_voltage": "50V", "case_code": "0603", "dielectric_material": "X8R"}),
+    ("CC0603KRX7R9BB104", "Yageo CC", True,
+     {"capacitance": "100nF", "rated_voltage": "50V", "case_code": "0603", "dielectric_material": "X7R"}),
+    ("CRCW06030000Z0EA", "Vishay CRCW", True,
+     {"resistance": "0Ω", "case_code": "0603", "technology": "Resistors Jumper SMD"}),
+    ("CRCW0603100RFKEA", "Vishay CRCW", True,
+     {"resistance": "100Ω", "tolerance": "±1%", "temp_coefficient": "100ppm/°C"}),
+    # SER numbers carry no current rating, so the datasheet search still has to run
+    ("SER2010-202MLD", "Coilcraft SER", False,
+     {"inductance": "2uH", "case_code": "SER2010", "shielding": "Shielded"}),
+]
+
+# Matches a series pattern, but a code is not in the decoder's tables
+NOT_DECODED = [
+    "CC0603KRX7R1BB104",   # Yageo voltage code 1
+    "CC0603KRX7R4BB104",   # Yageo voltage code 4
+    "CC9999KRX7R9BB104",   # unknown chip size
+    "GRM188Z91E475KE13D",  # unknown Murata dielectric
+    "GRM188R61Z475KE13D",  # unknown JIS voltage code
+    "C1608X8R9Z101K",      # unknown JIS voltage code
+    "CRCW1111100RFKEA",    # unknown Vishay size
+    "CRCW0603R1K0FKEA",    # two multiplier letters
+    "XYZ123",
+]
+
+
+@pytest.mark.parametrize("partnumber, name, complete, fields", DECODED)
+def test_decode_partnumber(partnumber, name, complete, fields):
+    decoded = decode_partnumber(partnumber)
+    assert decoded is not None
+    assert decoded.decoder == name
+    assert decoded.complete is complete
+    for key, value in fields.items():
+        assert decoded.fields[key] == value
+
+
+@pytest.mark.parametrize("partnumber", NOT_DECODED)
+def test_unknown_codes_fall_through(partnumber):
+    assert decode_partnumber(partnumber) is None